@@ -0,0 +1,157 @@
+"""
+RAG 检索相关性基准：纯向量 vs 纯全文 (BM25) vs 混合 (RRF 融合)，输出 precision@k / recall@k / MRR
+
+数据是合成的，不调用 embeddings 接口：
+- 每个职位属于一个技术方向 (web / data / mobile ...)，带 2~3 个该方向下的具体技能 (React, Vue, Django ...)
+- 文本向量 = 方向主题向量 (占主导) + 少量技能分量 + 噪声，模拟真实 embedding 的特点：
+  语义相近就靠得近，但对 "React" 和 "Vue" 这种精确的技能名区分度不高
+- 一半查询点名某个具体技能 ("Looking for React jobs ...")，相关集合 = 技能列表里含这个技能的职位；
+  另一半是换了说法的方向描述 (词面和职位文本几乎不重合)，相关集合 = 该方向的所有职位
+结论只说明两路检索的互补性，绝对数值不代表线上效果；线上评估请用真实问题和人工标注。
+
+用法: python benchmarks/bench_hybrid_retrieval.py [--rows 5000] [--queries 200] [--k 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import lancedb
+import numpy as np
+import pyarrow as pa
+
+# 路径补丁 (确保能找到 src)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.hybrid import reciprocal_rank_fusion
+from src.core.vector_store import build_fts_index, fts_query, vector_query
+
+FAMILIES = {
+    "web": ["React", "Vue", "Angular", "Django", "Flask", "Laravel", "Next.js", "Svelte"],
+    "data": ["Pandas", "Spark", "Airflow", "dbt", "Snowflake", "Kafka", "Tableau", "PowerBI"],
+    "mobile": ["Swift", "Kotlin", "Flutter", "ReactNative", "Xamarin", "Ionic"],
+    "ml": ["PyTorch", "TensorFlow", "LangChain", "HuggingFace", "OpenCV", "XGBoost"],
+    "devops": ["Kubernetes", "Terraform", "Ansible", "Jenkins", "Docker", "Prometheus"],
+    "design": ["Figma", "Photoshop", "Illustrator", "Sketch", "Blender", "AfterEffects"],
+}
+FAMILY_PHRASES = {
+    "web": "build a responsive web application frontend and backend",
+    "data": "design data pipelines and analytics dashboards",
+    "mobile": "develop a mobile app for iOS and Android",
+    "ml": "train machine learning models and deploy inference",
+    "devops": "set up cloud infrastructure and CI/CD deployment",
+    "design": "create visual design assets and user interface mockups",
+}
+# 同一方向的另一种说法，和职位文本几乎没有共同词 (全文检索的弱项)
+FAMILY_PARAPHRASES = {
+    "web": "someone to code our company site, pages plus server side",
+    "data": "help wrangling warehouse tables into business reporting",
+    "mobile": "need a phone application on both app stores",
+    "ml": "neural network training, prediction service in production",
+    "devops": "automate our servers, releases and monitoring",
+    "design": "branding, graphics, screens look and feel",
+}
+
+
+def make_corpus(rng, rows, dim, skill_weight):
+    families = list(FAMILIES)
+    topic = {f: rng.normal(size=dim) for f in families}
+    skill_vec = {s: rng.normal(size=dim) for skills in FAMILIES.values() for s in skills}
+
+    ids, texts, vectors, job_skills = [], [], [], []
+    for i in range(rows):
+        family = families[rng.integers(len(families))]
+        skills = list(rng.choice(FAMILIES[family], size=rng.integers(2, 4), replace=False))
+        vec = topic[family] + skill_weight * sum(skill_vec[s] for s in skills) + rng.normal(scale=0.5, size=dim)
+        ids.append(f"job-{i}")
+        texts.append(f"Title: {skills[0]} developer needed\n"
+                     f"Skills: {', '.join(skills)}\n"
+                     f"Desc: We need someone to {FAMILY_PHRASES[family]}.")
+        vectors.append(vec / np.linalg.norm(vec))
+        job_skills.append(set(skills))
+    return ids, texts, np.array(vectors, dtype=np.float32), job_skills, topic, skill_vec
+
+
+def make_queries(rng, n, dim, topic, skill_vec, skill_weight):
+    """
+    返回 [(种类, 技能或方向, 查询文本, 查询向量)]
+    技能查询的向量同样以方向为主，只带少量技能分量
+    """
+    queries = []
+    for i in range(n):
+        family = list(FAMILIES)[rng.integers(len(FAMILIES))]
+        if i % 2 == 0:
+            skill = FAMILIES[family][rng.integers(len(FAMILIES[family]))]
+            text = f"Looking for {skill} jobs"
+            vec = topic[family] + skill_weight * skill_vec[skill]
+            kind, target = "skill", skill
+        else:
+            text = FAMILY_PARAPHRASES[family]
+            vec = topic[family]
+            kind, target = "topic", family
+        vec = vec + rng.normal(scale=0.5, size=dim)
+        queries.append((kind, target, text, (vec / np.linalg.norm(vec)).astype(np.float32)))
+    return queries
+
+
+def metrics(ranked_ids, relevant, k):
+    hits = [doc_id in relevant for doc_id in ranked_ids]
+    precision = sum(hits[:k]) / k
+    recall = sum(hits[:2 * k]) / max(1, min(2 * k, len(relevant)))
+    mrr = next((1.0 / (i + 1) for i, hit in enumerate(hits) if hit), 0.0)
+    return precision, recall, mrr
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--candidates", type=int, default=20, help="每一路取多少候选参与融合")
+    ap.add_argument("--skill-weight", type=float, default=0.1, help="技能分量在向量里的权重 (越小向量越分不清技能)")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(42)
+    ids, texts, vectors, job_skills, topic, skill_vec = make_corpus(rng, args.rows, args.dim, args.skill_weight)
+    queries = make_queries(rng, args.queries, args.dim, topic, skill_vec, args.skill_weight)
+    # 相关集合: 技能 -> 职位, 方向 -> 职位
+    relevant_index = {}
+    for doc_id, skills in zip(ids, job_skills):
+        for s in skills:
+            relevant_index.setdefault(s, set()).add(doc_id)
+        family = next(f for f, members in FAMILIES.items() if skills & set(members))
+        relevant_index.setdefault(family, set()).add(doc_id)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = lancedb.connect(tmp)
+        print(f"📦 生成 {args.rows} 条合成职位 ({args.dim} 维)...")
+        tbl = db.create_table("bench", data=pa.table({
+            "id": ids,
+            "text": texts,
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), args.dim),
+        }))
+        build_fts_index(tbl)
+
+        fetch = max(2 * args.k, args.candidates)
+        scores = {}
+        for kind, target, text, vec in queries:
+            relevant = relevant_index[target]
+            vector_rows = vector_query(tbl, vec, fetch, exact=True).to_list()
+            fts_rows = fts_query(tbl, text, fetch).to_list()
+            hybrid_rows = reciprocal_rank_fusion([vector_rows, fts_rows], top_k=2 * args.k)
+            for name, rows in [("vector", vector_rows), ("fts", fts_rows), ("hybrid", hybrid_rows)]:
+                result = metrics([r["id"] for r in rows[:2 * args.k]], relevant, args.k)
+                scores.setdefault((kind, name), []).append(result)
+                scores.setdefault(("all", name), []).append(result)
+
+        header = f"{'queries':<8} {'mode':<8} {'P@' + str(args.k):>8} {'R@' + str(2 * args.k):>8} {'MRR':>8}"
+        print(header)
+        print("-" * len(header))
+        for (kind, name), values in sorted(scores.items(), key=lambda item: item[0][0] != "all"):
+            p, r, mrr = np.mean(values, axis=0)
+            print(f"{kind:<8} {name:<8} {p:>8.3f} {r:>8.3f} {mrr:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+UpworkParser 各解析后端的吞吐量基准 (pages/sec, cards/sec)
+
+先校验每个后端在语料上的输出和参照实现 (bs4) 完全一致，再计时。
+
+用法: python benchmarks/bench_parser.py [--rounds 20] [--corpus benchmarks/corpus]
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+# 路径补丁 (确保能找到 src)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parsers.upwork import UpworkParser, etree
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def load_corpus(corpus_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def check_identical(pages, backends):
+    reference = UpworkParser(backend="bs4")
+    ok = True
+    for name, html in pages:
+        expected = reference.parse(html)
+        for backend in backends:
+            got = UpworkParser(backend=backend).parse(html)
+            if got != expected:
+                print(f"❌ {backend} 输出与 bs4 不一致: {name}")
+                ok = False
+    return ok
+
+
+def bench(backend, pages, rounds):
+    parser = UpworkParser(backend=backend)
+    n_cards = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, html in pages:
+            n_cards += len(parser.parse(html))
+    elapsed = time.perf_counter() - start
+    n_pages = rounds * len(pages)
+    return n_pages / elapsed, n_cards / elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--corpus", default=DEFAULT_CORPUS)
+    args = ap.parse_args()
+
+    # 解析器每页都会打日志，计时时关掉
+    logging.getLogger("UpworkParser").setLevel(logging.WARNING)
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"⚠️ 语料目录为空: {args.corpus} (先运行 python benchmarks/make_corpus.py)")
+        return 1
+
+    backends = ["bs4"] + (["lxml"] if etree is not None else [])
+    print(f"📚 语料: {len(pages)} 个页面, 后端: {', '.join(backends)}")
+
+    if not check_identical(pages, backends[1:]):
+        return 1
+    print("✅ 所有后端输出一致")
+
+    print(f"{'backend':<8} {'pages/sec':>10} {'cards/sec':>10}")
+    for backend in backends:
+        pps, cps = bench(backend, pages, args.rounds)
+        print(f"{backend:<8} {pps:>10.1f} {cps:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
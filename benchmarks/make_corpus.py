@@ -0,0 +1,142 @@
+"""
+生成解析器基准测试用的搜索页语料 (benchmarks/corpus/*.html)
+
+页面结构按 Upwork /nx/search/jobs 的真实 DOM 复刻 (article[data-test=JobTile]、h3 > a、
+job-description-text、技能 token、头部的大段内联脚本)，文本内容是随机拼的，不含真实职位数据。
+各种预算/发布时间的写法都覆盖到了，用来验证不同解析后端的输出一致。
+
+用法: python benchmarks/make_corpus.py
+"""
+import html
+import os
+import random
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+WORDS = (
+    "data pipeline python scraping selenium dashboard streamlit tableau etl airflow postgres "
+    "aws api automation analysis report looker powerbi spark dbt snowflake bigquery real estate "
+    "listings crawler cleaning visualization machine learning model deploy docker fastapi"
+).split()
+SKILLS = [
+    "Python", "SQL", "Selenium", "BeautifulSoup", "Tableau", "Streamlit", "Pandas", "AWS",
+    "PostgreSQL", "Data Engineering", "ETL", "Apache Airflow", "Web Scraping", "Power BI", "dbt",
+]
+POSTED = ["2 minutes", "15 minutes", "1 hour", "3 hours", "yesterday", "2 days", "last week"]
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _budget(rng):
+    """各种预算写法，覆盖解析器的所有分支 (包括匹配不上的)"""
+    lo = rng.choice([10, 15, 25, 30, 45, 60])
+    hi = lo + rng.choice([5, 10, 20, 40])
+    fixed = rng.choice([50, 150, 500, 1200, 2500, 15000])
+    return rng.choice([
+        f'<strong>Hourly: ${lo}.00-${hi}.00</strong>',
+        f'<strong>Hourly</strong>: <span>${lo}.00-${hi:,}.00</span>',
+        f'<strong>Fixed price</strong> - <span data-test="is-fixed-price">Est. Budget: ${fixed:,}</span>',
+        f'<span>Budget: ${fixed:,}.00</span>',
+        f'<span>Est. budget: ${fixed:,}</span>',
+        f'<strong>Hourly</strong> - <span>${lo}.00/hr</span>',
+        f'<strong>Fixed price</strong> - <strong>Est. budget:</strong> <strong>${fixed:,}.00</strong>',
+        '<strong>Hourly</strong>',
+    ])
+
+
+def _posted(rng):
+    ago = rng.choice(POSTED)
+    return rng.choice([
+        f'<small data-test="job-pubilshed-date" class="text-light mb-1">Posted {ago} ago</small>',
+        f'<small data-test="job-pubilshed-date" class="text-light mb-1"><span>Posted</span> <span>{ago} ago</span></small>',
+        f'<small class="text-light">Posted&nbsp;{ago} ago</small>',
+    ])
+
+
+def _card(rng, idx, tag="article"):
+    uid = "".join(rng.choice("0123456789abcdef") for _ in range(18))
+    title = html.escape(_sentence(rng, rng.randint(3, 8)).rstrip("."))
+    desc = " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(2, 8)))
+    if rng.random() < 0.2:
+        desc = desc.replace(" data ", " data &amp; ", 1)
+    skills = "".join(
+        f'<span data-test="token" class="air3-token"><span>{s}</span></span>'
+        for s in rng.sample(SKILLS, rng.randint(2, 6))
+    )
+    href = f"/jobs/{title.replace(' ', '-')[:40]}_~01{uid}/?referrer_url_path=%2Fnx%2Fsearch%2Fjobs&page={idx}"
+    if rng.random() < 0.1:
+        href = f"https://www.upwork.com/jobs/~01{uid}"
+    extra = "<!-- job-tile-footer -->" if rng.random() < 0.3 else ""
+    return f"""
+<{tag} data-ev-label="search_results_impression" data-test="JobTile" data-ev-job-uid="{uid}" class="job-tile cursor-pointer px-md-4 air3-card air3-card-list px-4x">
+  <div class="d-flex job-tile-header">
+    <div class="d-flex flex-column job-tile-header-line-height flex-1 mr-4 mb-3">
+      {_posted(rng)}
+      <div class="air3-line-clamp-wrapper clamp mb-3"><div class="air3-line-clamp is-clamped" style="--lines: 3;">
+        <h3 class="h5 mb-0 mr-2 job-tile-title"><a data-test="job-tile-title-link UpLink" href="{href}" class="air3-link">{title}</a></h3>
+      </div></div>
+    </div>
+    <div class="d-flex job-tile-actions"><button aria-label="Save job" class="air3-btn air3-btn-secondary-inverted air3-btn-circle"><svg viewBox="0 0 24 24"><path d="M12 21l-9-9"/></svg></button></div>
+  </div>
+  <div data-test="JobInfo" class="job-tile-info">
+    <ul class="job-tile-info-list text-base-sm mb-4">
+      <li data-test="job-type-label">{_budget(rng)}</li>
+      <li data-test="experience-level"><strong>{rng.choice(["Entry level", "Intermediate", "Expert"])}</strong></li>
+      <li data-test="duration-label"><strong>Est. time:</strong> <span>{rng.choice(["Less than 1 month", "1 to 3 months", "More than 6 months"])}</span></li>
+    </ul>
+  </div>
+  <div data-test="UpCLineClamp JobDescription" class="air3-line-clamp-wrapper clamp mb-3">
+    <div class="air3-line-clamp is-clamped"><p data-test="job-description-text" class="mb-0 text-body-sm">
+      {desc}
+    </p></div>
+  </div>
+  <div class="air3-token-container">{skills}</div>
+  <ul data-test="JobInfoClient" class="text-light text-base-sm"><li data-test="payment-verified">Payment verified</li>
+    <li data-test="total-spent"><strong>${rng.randint(0, 900)}K+</strong> spent</li>
+    <li data-test="location"><span class="air3-badge-tagline">{rng.choice(["United States", "Australia", "Germany", "India"])}</span></li></ul>
+  {extra}
+</{tag}>"""
+
+
+def _page(rng, n_cards, tag="article"):
+    # 真实页面头部有大段内联 JSON/脚本，解析器也要为它们付出建树成本
+    state = ",".join(f'"k{i}":"{rng.choice(WORDS)}"' for i in range(rng.randint(800, 1500)))
+    nav = "".join(f'<li><a href="/nx/find-work/{w}">{w}</a></li>' for w in WORDS)
+    cards = "".join(_card(rng, i, tag) for i in range(n_cards))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Upwork - Search Jobs</title>
+<script>window.__NUXT__={{{state}}};</script>
+<style>.air3-card{{padding:16px}}.job-tile{{border-bottom:1px solid #e4ebe4}}</style>
+</head><body>
+<header class="nav-header"><nav><ul class="nav-menu">{nav}</ul></nav></header>
+<main id="main"><div class="jobs-grid"><section data-test="JobsList" class="card-list-container">{cards}
+</section></div></main>
+<footer class="footer-visitor"><p>&copy; 2015 - 2025 Upwork&reg; Global Inc.</p></footer>
+<script>window.dataLayer=window.dataLayer||[];</script>
+</body></html>
+"""
+
+
+def main():
+    rng = random.Random(20251018)
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    pages = [
+        ("data_engineering_p1", 10, "article"),
+        ("streamlit_p1", 20, "article"),
+        ("tableau_p1", 50, "article"),
+        ("real_estate_data_p1", 10, "article"),
+        ("web_scraping_p1", 50, "article"),
+        ("web_scraping_p2", 20, "div"),  # 没有 article 标签，走 data-test=JobTile 备用分支
+        ("no_results", 0, "article"),
+    ]
+    for name, n_cards, tag in pages:
+        path = os.path.join(CORPUS_DIR, f"upwork_search_{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(_page(rng, n_cards, tag))
+        print(f"✅ {path} ({n_cards} cards)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,51 @@ import os
 # 1. 路径补丁 (确保能找到 src)
 sys.path.append(os.getcwd())
 
-from src.database import engine, Base
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from src.database import Base, create_db_engine
 # 2. 必须导入模型，否则 Base 不知道要建什么表
-from src.models import UpworkJob
+from src.models import UpworkJob, CrawlWatermark, JobAnalysis, JobStat, TermStat, CrawlJob, CrawlKeyword
+
+# 大表上建索引 / 加列可能很慢，不设语句超时
+engine = create_db_engine("worker", statement_timeout_ms=0)
 
 def init():
     print("⚙️ 初始化数据库表...")
+    with engine.begin() as conn:
+        # 关键词子串匹配的 trigram 索引需要这个扩展
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     Base.metadata.create_all(bind=engine)
     print("✅ 表结构创建成功！")
+    ensure_columns()
+    ensure_indexes()
+
+def ensure_columns():
+    """
+    create_all 也不会给已存在的表加新列：模型里新增、库里还没有的列用 ALTER TABLE 补上
+    (例如全文检索的生成列 search_vector，大表上加生成列会重写整张表，请在低峰期执行)
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    print(f"➕ {table.name}.{column.name}")
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {ddl}"))
+
+def ensure_indexes():
+    """
+    create_all 不会给已经存在的表补建索引，这里逐个检查，缺的补上 (可重复执行)
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+    print("✅ 索引检查完成！")
 
 if __name__ == "__main__":
     init()
@@ -1,6 +1,8 @@
+from contextlib import asynccontextmanager
 import sentry_sdk
 from fastapi import FastAPI
 from src.api import routes
+from src.core.async_ai_client import AsyncAIClient
 
 # ==========================================
 # 1. Sentry 初始化 (硬编码 DSN，排除一切干扰)
@@ -22,10 +24,24 @@ except Exception as e:
 # ==========================================
 # 2. App 初始化
 # ==========================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    进程级共享资源：AI 客户端 (HTTP 连接池) + 向量库 (已打开的表句柄)
+    启动时创建并预热一次，所有请求复用，关闭时释放连接
+    """
+    ai_client = AsyncAIClient()
+    await ai_client.warm_up()
+    app.state.ai_client = ai_client
+    yield
+    await ai_client.aclose()
+
+
 app = FastAPI(
     title="UpHunter API",
     description="Upwork 职位数据猎手 - 企业级数据接口",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 3. 挂载路由
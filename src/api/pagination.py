@@ -0,0 +1,28 @@
+# 游标 (keyset) 分页：游标是上一页最后一行的排序键，编码成 URL 安全的字符串
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values):
+    """把排序键 (datetime / 数字 / 字符串) 编码成不透明的游标"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, *types):
+    """
+    解码游标，按 types 逐个转换 (datetime 用 fromisoformat)
+    格式不对返回 400
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("字段数不对")
+        return [datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(values, types)]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
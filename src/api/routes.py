@@ -1,46 +1,145 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import cast, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
 from sqlalchemy.orm import Session
-from src.database import get_db
-from src.models import UpworkJob
+from src.database import get_db, pool_stats
+from src.models import FTS_CONFIG, CrawlJob, JobStat, UpworkJob
+from src.storage.postgres import PostgresStorage
 from typing import List, Optional
 from src.api.auth import verify_api_key
-from src.core.ai_client import AIClient
+from src.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from src.core.async_ai_client import AsyncAIClient
+from src.core.budget_histogram import percentile
 from pydantic import BaseModel
 import json
 # 全局鉴权：这个文件里的所有接口，都必须带 API Key
 router = APIRouter(dependencies=[Depends(verify_api_key)])
 
 
+def _filter_jobs(query, job_type=None, min_budget=None, max_budget=None):
+    """职位列表 / 搜索共用的元数据过滤 (预算: 区间和 [min_budget, max_budget] 有交集)"""
+    if job_type:
+        query = query.filter(UpworkJob.job_type == job_type)
+    if min_budget is not None:
+        query = query.filter(UpworkJob.budget_max >= min_budget)
+    if max_budget is not None:
+        query = query.filter(UpworkJob.budget_min <= max_budget)
+    return query
+
+
 # --- 1. 获取职位列表 ---
 @router.get("/jobs", tags=["Jobs"])
 def get_jobs(
-        limit: int = 10,
+        response: Response,
+        limit: int = Query(10, ge=1, le=200),
         keyword: Optional[str] = None,
+        job_type: Optional[str] = None,
+        min_budget: Optional[int] = None,
+        max_budget: Optional[int] = None,
+        cursor: Optional[str] = None,
         db: Session = Depends(get_db)
 ):
     """
-    获取职位列表 (支持关键词过滤)
+    获取职位列表 (按抓取时间倒序，游标分页)
+    - keyword: 抓取关键词子串匹配 (pg_trgm 索引)
+    - job_type: Hourly / Fixed
+    - min_budget / max_budget: 预算区间和 [min_budget, max_budget] 有交集
+    - cursor: 上一页响应头 X-Next-Cursor 的值；没有这个响应头说明已经是最后一页
     """
     query = db.query(UpworkJob)
 
     if keyword:
         query = query.filter(UpworkJob.search_keyword.ilike(f"%{keyword}%"))
+    query = _filter_jobs(query, job_type, min_budget, max_budget)
+
+    # 游标分页: 从上一页最后一行之后继续 (走 (created_at, url) 索引，翻到多深都一样快)
+    if cursor:
+        created_at, url = decode_cursor(cursor, datetime, str)
+        query = query.filter(tuple_(UpworkJob.created_at, UpworkJob.url) < tuple_(created_at, url))
 
-    # 按时间倒序
-    jobs = query.order_by(UpworkJob.created_at.desc()).limit(limit).all()
+    # 按时间倒序，url 兜底保证顺序稳定；多取一条判断有没有下一页
+    jobs = query.order_by(UpworkJob.created_at.desc(), UpworkJob.url.desc()).limit(limit + 1).all()
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(jobs[-1].created_at, jobs[-1].url)
     return jobs
 
 
+# --- 1.1 全文检索 ---
+# ts_headline 的高亮参数：摘要最多 2 段，每段 15~35 个词
+_SNIPPET_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+@router.get("/jobs/search", tags=["Jobs"])
+def search_jobs(
+        response: Response,
+        q: str = Query(..., min_length=1, description="搜索词，支持 websearch 语法: \"exact phrase\" -exclude OR"),
+        limit: int = Query(10, ge=1, le=100),
+        job_type: Optional[str] = None,
+        min_budget: Optional[int] = None,
+        max_budget: Optional[int] = None,
+        cursor: Optional[str] = None,
+        db: Session = Depends(get_db)
+):
+    """
+    职位全文检索 (标题 + 技能 + 描述，Postgres tsvector + GIN 索引，不依赖 embedding 接口)
+    按 ts_rank_cd 相关度排序，返回带 <mark> 高亮的标题和描述摘要；
+    分页同 /jobs：响应头 X-Next-Cursor 作为下一页的 cursor
+    """
+    ts_query = func.websearch_to_tsquery(FTS_CONFIG, q)
+    # 转成 float8，游标里的相关度才能精确比较
+    rank = cast(func.ts_rank_cd(UpworkJob.search_vector, ts_query), DOUBLE_PRECISION)
+
+    stmt = (
+        select(
+            UpworkJob.url, UpworkJob.title, UpworkJob.job_type, UpworkJob.budget_min, UpworkJob.budget_max,
+            UpworkJob.posted_time, UpworkJob.skills, UpworkJob.description, UpworkJob.created_at,
+            rank.label("rank")
+        )
+        .where(UpworkJob.search_vector.bool_op("@@")(ts_query))
+    )
+    stmt = _filter_jobs(stmt, job_type, min_budget, max_budget)
+    if cursor:
+        last_rank, last_url = decode_cursor(cursor, float, str)
+        stmt = stmt.where(tuple_(rank, UpworkJob.url) < tuple_(cast(literal(last_rank), DOUBLE_PRECISION), last_url))
+
+    # 先排序分页，只对这一页的行生成高亮摘要 (ts_headline 要重新解析原文，比较贵)
+    page = stmt.order_by(rank.desc(), UpworkJob.url.desc()).limit(limit + 1).subquery()
+    rows = db.execute(
+        select(
+            page.c.url, page.c.title, page.c.job_type, page.c.budget_min, page.c.budget_max,
+            page.c.posted_time, page.c.skills, page.c.created_at, page.c.rank,
+            func.ts_headline(FTS_CONFIG, func.coalesce(page.c.title, ""), ts_query,
+                             "HighlightAll=true, StartSel=<mark>, StopSel=</mark>").label("title_highlight"),
+            func.ts_headline(FTS_CONFIG, func.coalesce(page.c.description, ""), ts_query,
+                             _SNIPPET_OPTIONS).label("snippet"),
+        )
+        .order_by(page.c.rank.desc(), page.c.url.desc())
+    ).mappings().all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]["rank"], rows[-1]["url"])
+    return [dict(row) for row in rows]
+
+
 # --- 2. 获取统计数据 ---
 @router.get("/stats", tags=["Analytics"])
 def get_stats(db: Session = Depends(get_db)):
     """
-    获取数据库统计概览
+    获取数据库统计概览 (读 job_stats 聚合表，耗时和职位总数无关)
     """
     try:
-        total = db.query(UpworkJob).count()
+        rows = db.query(
+            JobStat.job_type, func.sum(JobStat.job_count), func.max(JobStat.last_seen_at)
+        ).group_by(JobStat.job_type).all()
         return {
-            "total_jobs": total,
+            "total_jobs": sum(count for _, count, _ in rows),
+            "by_job_type": {job_type: count for job_type, count, _ in rows},
+            "keywords": db.query(func.count(func.distinct(JobStat.search_keyword))).scalar(),
+            "last_seen_at": max((seen for _, _, seen in rows if seen), default=None),
             "status": "healthy",
             "db_connection": "ok"
         }
@@ -51,54 +150,159 @@ def get_stats(db: Session = Depends(get_db)):
         }
 
 
-# --- 3. 触发爬虫 (后台任务) ---
-
-def run_crawler_task(keyword: str):
+@router.get("/stats/keywords", tags=["Analytics"])
+def get_keyword_stats(
+        keyword: Optional[str] = None,
+        job_type: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000),
+        db: Session = Depends(get_db)
+):
     """
-    实际执行爬虫的逻辑 (运行在后台线程)
+    每个抓取关键词 x 职位类型的市场统计，按职位数倒序
+    预算 = budget_max (没有则用 budget_min)，只统计有预算的职位 (不含 >= BUDGET_OUTLIER_LIMIT 的假预算)；
+    p50 / p90 是直方图估算的近似值
     """
-    print(f"🚀 [Background] 收到抓取请求: {keyword}")
-
-    try:
-        # 延迟导入，防止 Docker 启动时因缺 Chrome 而崩溃
-        from src.jobs import scrape_upwork
+    query = db.query(JobStat)
+    if keyword:
+        query = query.filter(JobStat.search_keyword.ilike(f"%{keyword}%"))
+    if job_type:
+        query = query.filter(JobStat.job_type == job_type)
+    stats = query.order_by(JobStat.job_count.desc(), JobStat.search_keyword).limit(limit).all()
 
-        # 这里调用爬虫的主入口
-        # 注意：目前的 scrape_upwork.run() 是跑全量关键词的
-        # 如果你想只跑这一个 keyword，你需要去改造 scrape_upwork.py
-        # 暂时先跑默认的全量逻辑
-        scrape_upwork.run()
+    return [
+        {
+            "keyword": stat.search_keyword,
+            "job_type": stat.job_type,
+            "job_count": stat.job_count,
+            "budget_count": stat.budget_count,
+            "budget_min": stat.budget_min,
+            "budget_max": stat.budget_max,
+            "budget_mean": round(stat.budget_sum / stat.budget_count, 2) if stat.budget_count else None,
+            "budget_p50": percentile(stat.budget_histogram, 0.5, stat.budget_min, stat.budget_max),
+            "budget_p90": percentile(stat.budget_histogram, 0.9, stat.budget_min, stat.budget_max),
+            "last_seen_at": stat.last_seen_at,
+        }
+        for stat in stats
+    ]
 
-    except ImportError as e:
-        print(f"❌ 严重错误: 无法加载爬虫模块 (可能是服务器缺少 Chrome 环境): {e}")
-    except Exception as e:
-        print(f"❌ 爬虫运行出错: {e}")
 
+# --- 3. 触发爬虫 (任务队列) ---
 
 @router.post("/crawl", tags=["Actions"])
 def trigger_crawl(
-        keyword: str,
-        background_tasks: BackgroundTasks
+        keyword: str = Query(..., min_length=1, max_length=100),
+        max_pages: int = Query(5, ge=1, le=20),  # 同 scrape_upwork.MAX_PAGES (这里不导入爬虫模块，API 进程不依赖 Chrome)
+        db: Session = Depends(get_db)
 ):
     """
-    触发爬虫任务 (异步)
+    提交抓取任务 (写入 crawl_jobs 队列，由独立的 crawl_worker 进程执行，接口立即返回)
+    同一个关键词已经在排队时不会重复入队，返回已有任务的 id；用 GET /crawl/{id} 查看进度
     """
-    # 将任务加入后台队列，立即返回响应
-    background_tasks.add_task(run_crawler_task, keyword)
+    storage = PostgresStorage(db)
+    job_id, created = storage.enqueue_crawl(keyword.strip(), max_pages)
+    storage.commit()
+    return {
+        "id": job_id,
+        "keyword": keyword.strip(),
+        "status": "pending",
+        "coalesced": not created,
+        "message": f"爬虫任务已{'提交' if created else '在队列中 (已合并)'} (关键词: {keyword.strip()})",
+    }
 
+
+@router.get("/crawl/{job_id}", tags=["Actions"])
+def get_crawl_job(job_id: int, db: Session = Depends(get_db)):
+    """抓取任务的状态和进度 (pending / running / done / failed)"""
+    job = db.get(CrawlJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Crawl job not found")
     return {
-        "message": f"爬虫任务已提交至后台队列 (关键词: {keyword})",
-        "status": "processing",
-        "note": "如果是云端环境且未配置 Chrome，此任务可能会失败，请查看后台日志。"
+        "id": job.id,
+        "keyword": job.search_keyword,
+        "status": job.status,
+        "max_pages": job.max_pages,
+        "pages_fetched": job.pages_fetched,
+        "new_jobs": job.new_jobs,
+        "attempts": job.attempts,
+        "worker": job.worker,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "heartbeat_at": job.heartbeat_at,
+        "finished_at": job.finished_at,
     }
+
+
 class ChatRequest(BaseModel):
     message: str
+    # 可选的检索过滤条件 (同 /jobs)：只在符合条件的职位里找
+    job_type: Optional[str] = None
+    min_budget: Optional[int] = None
+    max_budget: Optional[int] = None
+
+    def filters(self):
+        """转成向量库的过滤条件 (build_where 的格式)，没有任何条件时返回 None"""
+        filters = {"job_type": self.job_type, "budget_min": self.min_budget, "budget_max": self.max_budget}
+        return filters if any(v is not None for v in filters.values()) else None
+
+
+def get_ai_client(request: Request) -> AsyncAIClient:
+    """进程内共享的 AsyncAIClient (由 main.py 的 lifespan 创建并预热)"""
+    return request.app.state.ai_client
+
 
 @router.post("/chat", tags=["AI Features"])
-def chat_with_ai(request: ChatRequest):
+async def chat_with_ai(request: ChatRequest, ai: AsyncAIClient = Depends(get_ai_client)):
     """
     智能求职顾问 (RAG)
+    异步接口：等待 AI 接口时不占用线程池，/jobs /stats 这些同步接口不会被拖慢
+    可选 job_type / min_budget / max_budget 限定检索范围
     """
-    ai = AIClient()
-    response = ai.chat_with_jobs(request.message)
-    return {"reply": response}
\ No newline at end of file
+    response = await ai.chat_with_jobs(request.message, filters=request.filters())
+    return {"reply": response}
+
+
+def _sse(event, data):
+    """Server-Sent Events 帧 (data 用 JSON 编码，token 里的换行不会破坏帧格式)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream", tags=["AI Features"])
+async def chat_with_ai_stream(
+        request: ChatRequest,
+        http_request: Request,
+        ai: AsyncAIClient = Depends(get_ai_client)
+):
+    """
+    智能求职顾问 (RAG，流式版)
+    以 SSE 返回：先是 context (检索到的职位)，然后是逐个 token，最后 done (含首 token 延迟)
+    """
+    events = ai.stream_chat_with_jobs(request.message, filters=request.filters())
+
+    async def event_source():
+        try:
+            async for event, data in events:
+                if await http_request.is_disconnected():
+                    break
+                yield _sse(event, data)
+        finally:
+            # 客户端断开 (或响应被取消) 时关闭生成器，由它关闭上游连接
+            await events.aclose()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/chat/metrics", tags=["AI Features"])
+def chat_metrics(ai: AsyncAIClient = Depends(get_ai_client)):
+    """对话接口的延迟指标 (首 token 延迟 p50/p95/p99) 和各上游的在途请求数"""
+    return ai.metrics()
+
+
+@router.get("/stats/db", tags=["Analytics"])
+def db_metrics():
+    """数据库连接池状态：借连接的等待时间 p50/p95/p99、等超时次数、在用连接数"""
+    return pool_stats()
@@ -1,17 +1,17 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from sqlalchemy import create_engine
+from sqlalchemy import text
 import sys
 import os
-import re
 
 # 路径补丁
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from src.config import Config
+from src.database import get_engine
+from src.models import ALL_KEYWORDS
 
-# 连接数据库
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+# 连接数据库 (analytics 角色：连接少、允许较慢的分析查询)
+engine = get_engine("analytics")
 
 st.set_page_config(page_title="UpHunter Market Insights", layout="wide", page_icon="🏹")
 
@@ -21,14 +21,52 @@ st.title("🏹 UpHunter: 自由职业市场情报中心")
 # 1. 加载数据
 @st.cache_data(ttl=60)
 def load_data():
+    """只取图表和列表用到的列 (description 很大，不读)"""
     try:
-        return pd.read_sql("SELECT * FROM upwork_jobs", engine)
+        return pd.read_sql(
+            "SELECT search_keyword, job_type, budget_max, title, url, posted_time, created_at FROM upwork_jobs",
+            engine,
+        )
     except Exception as e:
         st.error(f"数据库连接失败: {e}")
         return pd.DataFrame()
 
 
+STAT_COLUMNS = ["search_keyword", "job_type", "job_count", "budget_count", "budget_sum", "budget_min", "budget_max"]
+
+
+@st.cache_data(ttl=60)
+def load_stats():
+    """
+    job_stats 聚合表 (每个 关键词 x 职位类型 一行)，KPI 和数量对比直接用它，不用扫全表
+    预算统计已经排除了 >= BUDGET_OUTLIER_LIMIT 的假预算
+    """
+    try:
+        return pd.read_sql(f"SELECT {', '.join(STAT_COLUMNS)} FROM job_stats", engine)
+    except Exception as e:
+        st.error(f"统计查询失败: {e}")
+        return pd.DataFrame(columns=STAT_COLUMNS)
+
+
+@st.cache_data(ttl=60)
+def load_top_terms(n):
+    """读全局合计行的 Top N (走 (search_keyword, occurrences) 索引，不扫全表)"""
+    try:
+        return pd.read_sql(
+            text(
+                "SELECT term AS \"Word\", occurrences AS \"Count\" FROM term_stats "
+                "WHERE search_keyword = :all ORDER BY occurrences DESC LIMIT :n"
+            ),
+            engine,
+            params={"all": ALL_KEYWORDS, "n": n},
+        )
+    except Exception as e:
+        st.error(f"词频查询失败: {e}")
+        return pd.DataFrame()
+
+
 df = load_data()
+stats = load_stats()
 
 if df.empty:
     st.warning("暂无数据，请运行爬虫。")
@@ -47,11 +85,16 @@ clean_df = df_clean[mask]
 df_clean = df_clean[df_clean['budget_max'] > 0]  # 只看有预算的
 df_clean = df_clean[df_clean['budget_max'] < 50000]  # 过滤掉比如 100万 的假预算
 
-# 3. KPI
+# 3. KPI (读 job_stats 聚合表)
+if stats.empty:
+    st.info("统计表为空 (老数据请运行 python -m src.jobs.rebuild_stats)")
+fixed = stats[stats['job_type'] == 'Fixed']
+hourly = stats[stats['job_type'] == 'Hourly']
+fixed_count = fixed['budget_count'].sum()
 col1, col2, col3 = st.columns(3)
-col1.metric("总职位数", len(df))
-col2.metric("平均预算 (Fixed)", f"${df_clean[df_clean['job_type'] == 'Fixed']['budget_max'].mean():.0f}")
-col3.metric("最高时薪 (Hourly)", f"${df_clean[df_clean['job_type'] == 'Hourly']['budget_max'].max():.0f}/hr")
+col1.metric("总职位数", int(stats['job_count'].sum()))
+col2.metric("平均预算 (Fixed)", f"${fixed['budget_sum'].sum() / fixed_count:.0f}" if fixed_count else "-")
+col3.metric("最高时薪 (Hourly)", f"${hourly['budget_max'].max():.0f}/hr" if hourly['budget_max'].notna().any() else "-")
 
 st.markdown("---")
 
@@ -73,32 +116,25 @@ col_left, col_right = st.columns(2)
 
 with col_left:
     st.subheader("📊 职位数量对比")
-    count_df = df['search_keyword'].value_counts().reset_index()
+    count_df = (stats.groupby('search_keyword', as_index=False)['job_count'].sum()
+                .sort_values('job_count', ascending=False))
     count_df.columns = ['Keyword', 'Count']
     fig_bar = px.bar(count_df, x='Keyword', y='Count', color='Keyword')
     st.plotly_chart(fig_bar, use_container_width=True)
 
 with col_right:
     st.subheader("☁️ 热门词汇 (Description)")
-    # 🔍 Debug: 看看原始文本是不是空的
-    raw_text = " ".join(df['description'].astype(str).tolist())
-    st.write(f"Debug: 文本总长度 = {len(raw_text)}")
-
-    from collections import Counter
-
-    text = " ".join(df['description'].astype(str).tolist()).lower()
-    # 简单的停用词过滤
-    stopwords = set(['the', 'and', 'to', 'of', 'a', 'in', 'for', 'is', 'on', 'with', 'we', 'are', 'looking'])
-    words = [w for w in re.findall(r'\w+', text) if len(w) > 3 and w not in stopwords]
-    common_words = Counter(words).most_common(15)
-
-    #只取前 10 个
-    wc_df = pd.DataFrame(common_words[0:10], columns=['Word', 'Count'])
-    # orientation='h' 让条条横过来，字就不会挤在一起了
-    fig_wc = px.bar(wc_df, x='Count', y='Word', orientation='h', title="Top 10 Keywords")
-    # 倒序排列，让最大的在上面
-    fig_bar.update_layout(yaxis={'categoryorder': 'total ascending'})
-    st.plotly_chart(fig_wc, use_container_width=True)
+    # 词频在入库时已经统计好 (term_stats 表，分词规则见 src/core/text_stats.py)，这里只取 Top N
+    top_terms = load_top_terms(10)
+    if top_terms.empty:
+        st.info("暂无词频数据 (老数据请运行 python -m src.jobs.backfill_term_stats，"
+                "已统计过的再加 --rollup 生成全局合计)")
+    else:
+        # orientation='h' 让条条横过来，字就不会挤在一起了
+        fig_wc = px.bar(top_terms, x='Count', y='Word', orientation='h', title="Top 10 Keywords")
+        # 倒序排列，让最大的在上面
+        fig_wc.update_layout(yaxis={'categoryorder': 'total ascending'})
+        st.plotly_chart(fig_wc, use_container_width=True)
 
 # 6. 详细列表
 with st.expander("🔎 职位猎手 (点击标题跳转)"):
@@ -5,6 +5,17 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _db_profile(role, pool_size, max_overflow, pool_timeout, statement_timeout_ms):
+    """一个数据库连接角色的连接池参数，每项都可以用 DB_<ROLE>_<参数> 环境变量覆盖"""
+    prefix = f"DB_{role.upper()}_"
+    return {
+        "pool_size": int(os.getenv(prefix + "POOL_SIZE", pool_size)),
+        "max_overflow": int(os.getenv(prefix + "MAX_OVERFLOW", max_overflow)),
+        "pool_timeout": float(os.getenv(prefix + "POOL_TIMEOUT", pool_timeout)),  # 连接池满时最多等多久 (秒)
+        "statement_timeout_ms": int(os.getenv(prefix + "STATEMENT_TIMEOUT_MS", statement_timeout_ms)),  # 0 = 不限
+    }
+
+
 class Config:
     # 数据库配置
     DB_USER = os.getenv("DB_USER", "lee")
@@ -14,6 +25,55 @@ class Config:
     DB_NAME = os.getenv("DB_NAME", "uphunter_db")
 
     EMBEDDING_MODEL = "BAAI/bge-m3"
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))  # 每个 embeddings 请求带多少条文本
+    EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))  # 同时在途的 embeddings 请求数
+    EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "3"))  # 单个批次失败后的重试次数 (指数退避)
+    # 向量索引 (LanceDB ANN)
+    VECTOR_METRIC = os.getenv("VECTOR_METRIC", "cosine")
+    VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "IVF_PQ")  # 或 IVF_HNSW_SQ
+    VECTOR_INDEX_MIN_ROWS = int(os.getenv("VECTOR_INDEX_MIN_ROWS", "5000"))  # 少于这个行数暴力扫描更快，不建索引
+    VECTOR_REINDEX_RATIO = float(os.getenv("VECTOR_REINDEX_RATIO", "0.2"))  # 未索引行占比超过它就重建索引
+    VECTOR_NPROBES = int(os.getenv("VECTOR_NPROBES", "20"))  # 查询时探查多少个 IVF 分区 (越大越准越慢)
+    VECTOR_REFINE_FACTOR = int(os.getenv("VECTOR_REFINE_FACTOR", "10"))  # PQ 召回 top_k * N 条后用原始向量重排，0 = 不重排
+    # 向量缓存 (内存 LRU + 本地 SQLite)
+    EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") == "1"
+    EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join("data", "embedding_cache.sqlite"))
+    EMBED_CACHE_MEMORY_SIZE = int(os.getenv("EMBED_CACHE_MEMORY_SIZE", "4096"))  # 内存里最多缓存多少条
+    EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))  # 磁盘上最多缓存多少条 (bge-m3 每条约 4KB)
+    # AI 接口的 HTTP 连接池 (API 进程内共享一个客户端，连接 keep-alive 复用)
+    AI_HTTP_MAX_CONNECTIONS = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "50"))
+    AI_HTTP_MAX_KEEPALIVE = int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "20"))  # 空闲时保留的长连接数
+    AI_HTTP_TIMEOUT = float(os.getenv("AI_HTTP_TIMEOUT", "60"))  # 单个请求超时 (秒)
+    VECTOR_REFRESH_SECONDS = float(os.getenv("VECTOR_REFRESH_SECONDS", "5"))  # 常驻的向量表句柄多久检查一次新版本
+    # RAG 检索方式: hybrid = 向量 + 全文 (BM25) 并行检索再用 RRF 融合；vector = 只用向量
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # 每一路取多少候选参与融合
+    HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+    # 异步 API 路径：每个上游的并发上限 (同时在途的请求数) 和超时 (秒，排队等待也算在内)
+    AI_CHAT_MAX_INFLIGHT = int(os.getenv("AI_CHAT_MAX_INFLIGHT", "64"))
+    AI_CHAT_TIMEOUT = float(os.getenv("AI_CHAT_TIMEOUT", "30"))  # 对话：排队等名额 + 流式到拿到响应头为止
+    AI_CHAT_TOTAL_TIMEOUT = float(os.getenv("AI_CHAT_TOTAL_TIMEOUT", "120"))  # 非流式对话：整个回答生成完的上限
+    AI_EMBED_MAX_INFLIGHT = int(os.getenv("AI_EMBED_MAX_INFLIGHT", "32"))
+    AI_EMBED_TIMEOUT = float(os.getenv("AI_EMBED_TIMEOUT", "15"))
+    VECTOR_SEARCH_MAX_INFLIGHT = int(os.getenv("VECTOR_SEARCH_MAX_INFLIGHT", "16"))
+    VECTOR_SEARCH_TIMEOUT = float(os.getenv("VECTOR_SEARCH_TIMEOUT", "5"))
+    # /chat 语义回答缓存 (相似的问题 + 向量表没更新 => 直接返回之前的回答)
+    CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "1") == "1"
+    CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.9"))  # 余弦相似度阈值，越高越保守
+    CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "3600"))  # 秒
+    CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000"))
+    # 服务商限流 (0 = 不限)，批量分析任务按这个节奏发请求
+    AI_RPM_LIMIT = int(os.getenv("AI_RPM_LIMIT", "500"))
+    AI_TPM_LIMIT = int(os.getenv("AI_TPM_LIMIT", "100000"))
+    # 职位 AI 分析 (analyze_jobs_with_ai)
+    ANALYZE_BATCH_SIZE = int(os.getenv("ANALYZE_BATCH_SIZE", "200"))  # 每批领取多少个职位，处理完就提交
+    ANALYZE_CONCURRENCY = int(os.getenv("ANALYZE_CONCURRENCY", "16"))  # 同时在途的 AI 请求数
+    ANALYZE_MAX_ATTEMPTS = int(os.getenv("ANALYZE_MAX_ATTEMPTS", "3"))  # 同一个职位最多失败几次就不再重试
+    ANALYZE_LEASE_SECONDS = int(os.getenv("ANALYZE_LEASE_SECONDS", "900"))  # 领取的职位多久没写回结果就可以被别的进程重新领取
+    SKILLS_BATCH_TOKEN_BUDGET = int(os.getenv("SKILLS_BATCH_TOKEN_BUDGET", "6000"))  # 批量提取时每个请求的输入 token 上限
+    SKILLS_BATCH_MAX_JOBS = int(os.getenv("SKILLS_BATCH_MAX_JOBS", "20"))  # 每个请求最多带几个职位
+    # 市场统计 (job_stats)：预算达到这个值的多半是占位的假预算 (比如 100万)，不计入预算统计
+    BUDGET_OUTLIER_LIMIT = int(os.getenv("BUDGET_OUTLIER_LIMIT", "50000"))
 
     #SENTRY_DSN = os.getenv("SENTRY_DSN")
     SENTRY_DSN = "https://956951d1295123307ddddeaa185c8355@o4510447033843712.ingest.us.sentry.io/4510447065890816"
@@ -27,9 +87,42 @@ class Config:
         else:
             SQLALCHEMY_DATABASE_URI = f"postgresql://{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+    # 连接池：按进程角色区分 (见 src/database.py 的 get_engine)
+    # api = 接口进程，请求多、查询短，等不到连接就尽快失败；worker = 爬虫 / AI 分析等批处理；
+    # analytics = Dashboard / 导出，连接少、允许慢查询
+    DB_PROFILES = {
+        "api": _db_profile("api", 10, 10, 5, 15000),
+        "worker": _db_profile("worker", 5, 5, 30, 300000),
+        "analytics": _db_profile("analytics", 2, 2, 30, 120000),
+    }
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 连接用多久后重建 (秒)，防止被中间件悄悄断开
+    # 通过 PgBouncer (transaction pooling) 连接时打开：连接池交给 PgBouncer，statement_timeout 改为每个事务 SET LOCAL
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
     # AI 配置
     AI_API_KEY = os.getenv("AI_API_KEY")
     AI_BASE_URL = os.getenv("AI_BASE_URL", "https://api.openai.com/v1")
     AI_MODEL = "gpt-3.5-turbo" if os.getenv("AI_PROVIDER") == "openai" else "deepseek-chat"
 
-    API_SECRET_KEY = os.getenv("API_SECRET_KEY", "default-insecure-key")
\ No newline at end of file
+    API_SECRET_KEY = os.getenv("API_SECRET_KEY", "default-insecure-key")
+
+    # 爬虫并发配置 (浏览器池)
+    CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "3"))  # 同时开几个浏览器
+    CRAWL_PAGE_DELAY_MIN = float(os.getenv("CRAWL_PAGE_DELAY_MIN", "10"))  # 每个 worker 两次翻页之间的最短间隔 (秒)
+    CRAWL_PAGE_DELAY_MAX = float(os.getenv("CRAWL_PAGE_DELAY_MAX", "15"))
+    CRAWL_RECYCLE_PAGES = int(os.getenv("CRAWL_RECYCLE_PAGES", "5"))  # 每个浏览器抓多少页后重启，防止指纹积累
+    CRAWL_USE_XVFB = os.getenv("CRAWL_USE_XVFB", "0") == "1"  # 服务器上为每个 worker 启动独立的 Xvfb 虚拟显示
+    CRAWL_JITTER_BUDGET = float(os.getenv("CRAWL_JITTER_BUDGET", "2"))  # 每页"人类停顿"总预算 (秒)
+    CRAWL_SETTLE_TIME = float(os.getenv("CRAWL_SETTLE_TIME", "1"))  # 卡片数量稳定多久算加载完成 (秒)
+    # 抓取任务队列 (crawl_worker)
+    CRAWL_WORKER_POLL_SECONDS = float(os.getenv("CRAWL_WORKER_POLL_SECONDS", "5"))  # 队列为空时多久查一次
+    CRAWL_JOB_STALE_SECONDS = int(os.getenv("CRAWL_JOB_STALE_SECONDS", "900"))  # 多久没有心跳算 worker 失联
+    CRAWL_JOB_MAX_ATTEMPTS = int(os.getenv("CRAWL_JOB_MAX_ATTEMPTS", "3"))  # 失联重试几次后标记失败
+    # 自适应定时抓取 (crawl_scheduler)
+    CRAWL_MIN_INTERVAL = int(os.getenv("CRAWL_MIN_INTERVAL", "600"))  # 单个关键词最短抓取间隔 (秒)
+    CRAWL_MAX_INTERVAL = int(os.getenv("CRAWL_MAX_INTERVAL", "86400"))  # 最长间隔 (秒)
+    CRAWL_DEFAULT_INTERVAL = int(os.getenv("CRAWL_DEFAULT_INTERVAL", "3600"))  # 新关键词还没有数据时的间隔
+    # 希望每次抓取大约拿到多少个新职位 (小于一页的量：增量模式下基本只需要加载第 1 页)
+    CRAWL_TARGET_NEW_JOBS = float(os.getenv("CRAWL_TARGET_NEW_JOBS", "8"))
+    CRAWL_PAGE_BUDGET_PER_HOUR = float(os.getenv("CRAWL_PAGE_BUDGET_PER_HOUR", "60"))  # 所有关键词每小时最多加载多少页
+    CRAWL_SCHEDULER_TICK = float(os.getenv("CRAWL_SCHEDULER_TICK", "30"))  # 调度器多久检查一次到期的关键词
\ No newline at end of file
@@ -1,59 +1,162 @@
-from openai import OpenAI
+import json
 from src.config import Config
 from src.core.logger import setup_logger
+from src.core.embedder import Embedder
+from src.core.openai_client import create_openai_client
+from src.core.rate_limit import estimate_tokens
 from src.core.vector_store import VectorStore  # 引入向量库
 
 logger = setup_logger("AIClient")
 
+NO_RESULTS_REPLY = "抱歉，数据库中没有找到相关的职位数据。请先运行爬虫抓取更多数据。"
+
+# 对话模型 (SiliconFlow 免费且强大的 DeepSeek V3)
+CHAT_MODEL = "deepseek-ai/DeepSeek-V3"
+
+# 技能提取 Prompt 的版本号：改了 Prompt 就 +1，analyze_jobs_with_ai 会把旧版本分析过的职位重跑一遍
+SKILLS_PROMPT_VERSION = 1
+SKILLS_PROMPT = "请从以下职位描述中，提取出最核心的 3-5 个技术栈关键词，用逗号分隔。例如: Python, SQL, AWS。"
+# 批量版：一个请求里带多个职位，要求返回 JSON 数组 (和单条版的提取口径一致)
+SKILLS_BATCH_PROMPT = (
+    "下面有 {n} 个职位描述，每个以 ### [编号] 开头。"
+    "请分别提取每个职位最核心的 3-5 个技术栈关键词。\n"
+    "只返回一个 JSON 数组，每个职位一个元素，不要任何解释，格式:\n"
+    '[{{"id": "1", "skills": ["Python", "SQL", "AWS"]}}]'
+)
+SKILLS_DESC_MAX_CHARS = 2000  # 每个描述截断到多少字符
+SKILLS_OUTPUT_TOKENS_PER_JOB = 40  # 每个职位的 JSON 结果大约多少 token，用来设 max_tokens
+
+
+def pack_skill_batches(jobs, token_budget=None, max_jobs=None):
+    """
+    按 token 预算把职位打包：每包的 Prompt 估算 token 不超过 token_budget，且不超过 max_jobs 个
+    描述短的职位一包能装更多，长的自动少装
+    :param jobs: list of (id, description)
+    :return: list of list of (id, description)
+    """
+    token_budget = token_budget or Config.SKILLS_BATCH_TOKEN_BUDGET
+    max_jobs = max_jobs or Config.SKILLS_BATCH_MAX_JOBS
+    batches, current, used = [], [], estimate_tokens(SKILLS_BATCH_PROMPT)
+    base = used
+    for job_id, description in jobs:
+        cost = estimate_tokens(description[:SKILLS_DESC_MAX_CHARS]) + 8
+        if current and (used + cost > token_budget or len(current) >= max_jobs):
+            batches.append(current)
+            current, used = [], base
+        current.append((job_id, description))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_skills_json(content, expected_ids):
+    """
+    解析并校验批量提取的结果
+    :return: {id: "Python, SQL, AWS"}，只包含校验通过的 id (缺失 / 格式不对的由调用方单独重试)
+    :raises ValueError: 整体不是 JSON 数组
+    """
+    text = (content or "").strip()
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end < start:
+        raise ValueError("返回内容里没有 JSON 数组")
+    data = json.loads(text[start:end + 1])
+    if not isinstance(data, list):
+        raise ValueError("返回的 JSON 不是数组")
+
+    results = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        job_id = str(item.get("id", "")).strip().strip("[]")
+        skills = item.get("skills")
+        if job_id not in expected_ids or job_id in results or not isinstance(skills, list):
+            continue
+        skills = [x.strip() for x in skills if isinstance(x, str) and 0 < len(x.strip()) <= 50]
+        if skills:
+            results[job_id] = ", ".join(skills[:8])
+    return results
+
 
 class AIClient:
-    def __init__(self):
+    """
+    AI 客户端 (对话 + 检索，同步版，给后台任务 / 脚本用)
+    API 进程用的是 src/core/async_ai_client.py 里的 AsyncAIClient。
+    同一个实例复用 HTTP 连接池、向量库连接和已打开的表句柄，不要每次调用都 new 一个。
+    """
+
+    def __init__(self, rate_limiter=None):
+        """
+        :param rate_limiter: 可选的 RateLimiter (src/core/rate_limit.py)，批量任务用它遵守服务商的 RPM/TPM 限制
+        """
+        self._vector_store = None
+        self.rate_limiter = rate_limiter
         if not Config.AI_API_KEY:
             logger.warning("⚠️ 未配置 AI_API_KEY，AI 功能将不可用")
             self.client = None
             return
 
-        # 初始化客户端 (SiliconFlow)
-        self.client = OpenAI(
-            api_key=Config.AI_API_KEY,
-            base_url=Config.AI_BASE_URL
-        )
+        # 初始化客户端 (SiliconFlow)，自带 keep-alive 连接池
+        self.client = create_openai_client()
 
-        # 显式指定对话模型 (SiliconFlow 免费且强大的 DeepSeek V3)
-        self.chat_model = "deepseek-ai/DeepSeek-V3"
+        # 显式指定对话模型
+        self.chat_model = CHAT_MODEL
 
         # 显式指定嵌入模型 (必须和 vector_store 里一致)
-        self.embedding_model = "BAAI/bge-m3"
+        self.embedding_model = Config.EMBEDDING_MODEL
+
+        # 向量生成器：复用同一个 OpenAI 客户端，并且和 VectorStore 共用缓存
+        self.embedder = Embedder(client=self.client, model=self.embedding_model)
 
     def _get_embedding(self, text):
-        """内部方法：获取向量 (供 VectorStore 使用)"""
-        text = text.replace("\n", " ")
-        try:
-            return self.client.embeddings.create(
-                input=[text],
-                model=self.embedding_model
-            ).data[0].embedding
-        except Exception as e:
-            logger.error(f"❌ Embedding 失败: {e}")
-            # bge-m3 维度是 1024
-            return [0.0] * 1024
+        """内部方法：获取向量 (带缓存)，失败返回 None"""
+        return self.embedder.embed(text)
 
-    def chat_with_jobs(self, user_query):
-        """
-        RAG 核心逻辑：先搜向量库，再问 AI
-        """
-        if not self.client:
-            return "AI 服务未初始化"
+    @property
+    def vector_store(self):
+        """共用同一个 VectorStore (第一次用到时才连接 LanceDB)"""
+        if self._vector_store is None:
+            self._vector_store = VectorStore(embedder=self.embedder)
+        return self._vector_store
 
-        # 1. 搜索最相关的职位 (Retrieval)
-        # VectorStore 内部会调用 self.client (如果我们在 VectorStore 里传入 client 更好，但现在解耦也行)
-        vector_store = VectorStore()
-        results = vector_store.search(user_query, top_k=5)
+    def close(self):
+        """释放连接池 (应用关闭时调用)"""
+        if self.client:
+            self.client.close()
 
-        if not results:
-            return "抱歉，数据库中没有找到相关的职位数据。请先运行爬虫抓取更多数据。"
+    def _create(self, messages, temperature, max_tokens=None):
+        """一次对话请求 (配置了限流器时先申请 RPM/TPM 额度，拿到 usage 后多退少补)，返回完整响应"""
+        reserved = 0
+        if self.rate_limiter:
+            estimate = sum(estimate_tokens(m["content"]) for m in messages) + (max_tokens or 512)
+            reserved = self.rate_limiter.acquire(estimate)
+        extra = {"max_tokens": max_tokens} if max_tokens else {}
+        response = self.client.chat.completions.create(
+            model=self.chat_model,
+            messages=messages,
+            temperature=temperature,
+            **extra
+        )
+        if self.rate_limiter and response.usage:
+            self.rate_limiter.settle(reserved, response.usage.total_tokens)
+        return response
 
-        # 2. 构建 Prompt (Augmentation)
+    def _complete(self, messages, temperature, max_tokens=None):
+        """同 _create，只返回回答文本"""
+        return self._create(messages, temperature, max_tokens).choices[0].message.content
+
+    def retrieve(self, user_query, top_k=5, filters=None):
+        """
+        检索最相关的职位 (Retrieval)，复用常驻的 VectorStore 和表句柄；默认向量 + 全文混合检索
+        :param filters: 元数据过滤条件，见 vector_store.build_where
+        """
+        if Config.RETRIEVAL_MODE == "hybrid":
+            return self.vector_store.hybrid_search(user_query, top_k=top_k, filters=filters)
+        return self.vector_store.search(user_query, top_k=top_k, filters=filters)
+
+    @staticmethod
+    def build_messages(user_query, results):
+        """构建 Prompt (Augmentation)"""
         context_text = ""
         for i, item in enumerate(results):
             # 处理 LanceDB 返回的数据结构 (可能是 dict 或 object)
@@ -82,18 +185,42 @@ class AIClient:
         2. 说明推荐理由。
         3. 如果职位预算太低或不匹配，请直说。
         """
+        return [
+            {"role": "system", "content": "你是一个乐于助人的数据分析助手。"},
+            {"role": "user", "content": prompt}
+        ]
+
+    @staticmethod
+    def summarize_results(results):
+        """检索结果里给前端展示的字段 (去掉向量等大字段)"""
+        return [
+            {
+                "id": item.get('id'),
+                "title": item.get('title', 'Unknown'),
+                "budget": item.get('budget', 'Unknown'),
+                "type": item.get('type'),
+                "distance": float(item['_distance']) if item.get('_distance') is not None else None,
+                "score": float(item['_rrf']) if item.get('_rrf') is not None else None,
+            }
+            for item in results
+        ]
+
+    def chat_with_jobs(self, user_query, filters=None):
+        """
+        RAG 核心逻辑：先搜向量库，再问 AI
+        :param filters: 可选的检索过滤条件 {"job_type", "budget_min", "budget_max"}
+        """
+        if not self.client:
+            return "AI 服务未初始化"
+
+        # 1. 检索
+        results = self.retrieve(user_query, filters=filters)
+        if not results:
+            return NO_RESULTS_REPLY
 
-        # 3. 生成回答 (Generation)
+        # 2. 构建 Prompt + 3. 生成回答 (Generation)
         try:
-            response = self.client.chat.completions.create(
-                model=self.chat_model,
-                messages=[
-                    {"role": "system", "content": "你是一个乐于助人的数据分析助手。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            return response.choices[0].message.content
+            return self._complete(self.build_messages(user_query, results), temperature=0.7)
         except Exception as e:
             logger.error(f"RAG 生成失败: {e}")
             return f"AI 思考超时或出错: {e}"
@@ -101,16 +228,79 @@ class AIClient:
     def extract_skills(self, job_description):
         """(旧功能) 用于提取技能"""
         if not self.client: return "Error"
-        prompt = "请从以下职位描述中，提取出最核心的 3-5 个技术栈关键词，用逗号分隔。例如: Python, SQL, AWS。"
         try:
-            response = self.client.chat.completions.create(
-                model=self.chat_model,
-                messages=[
-                    {"role": "system", "content": "只能返回关键词，不要废话。"},
-                    {"role": "user", "content": f"{prompt}\n\n{job_description[:2000]}"}
-                ],
-                temperature=0.1
-            )
-            return response.choices[0].message.content.strip()
-        except Exception:
+            return self._extract_skills_text(job_description)
+        except Exception as e:
+            logger.warning(f"⚠️ 技能提取失败: {e}")
             return "Error"
+
+    def _extract_skills_text(self, job_description):
+        """单个职位提取技能，接口异常直接抛出"""
+        return self._complete(
+            [
+                {"role": "system", "content": "只能返回关键词，不要废话。"},
+                {"role": "user", "content": f"{SKILLS_PROMPT}\n\n{job_description[:SKILLS_DESC_MAX_CHARS]}"}
+            ],
+            temperature=0.1,
+            max_tokens=64
+        ).strip()
+
+    def extract_skills_batch(self, jobs):
+        """
+        批量提取技能 (先按 token 预算打包，每包一个请求)
+        :param jobs: list of (id, description)
+        :return: {id: "Python, SQL, AWS"}，提取失败的 id 不在结果里 (接口异常直接抛出)
+        """
+        results = {}
+        for pack in pack_skill_batches(jobs):
+            results.update(self.extract_skills_pack(pack))
+        return results
+
+    def extract_skills_pack(self, pack):
+        """
+        一个请求提取一包职位的技能，返回 {id: skills}
+        - 输出被截断 / 整体不是合法 JSON: 对半拆开分别重试
+        - 个别职位缺失或格式不对: 单独重试
+        - 接口 / 网络异常 (SDK 自带的退避重试之后仍然失败) 直接抛出，不拆包：
+          调用方跳过这一包，这些职位保持未分析，之后重新领取
+        """
+        if not self.client or not pack:
+            return {}
+        if len(pack) == 1:
+            return self._extract_one(*pack[0])
+
+        # Prompt 里用短编号代替真实 id (URL 很长，白白浪费 token)
+        local_ids = {str(i + 1): job for i, job in enumerate(pack)}
+        body = "\n\n".join(
+            f"### [{local_id}]\n{description[:SKILLS_DESC_MAX_CHARS]}"
+            for local_id, (_, description) in local_ids.items()
+        )
+        response = self._create(
+            [
+                {"role": "system", "content": "你是职位信息抽取助手，只输出 JSON。"},
+                {"role": "user", "content": f"{SKILLS_BATCH_PROMPT.format(n=len(pack))}\n\n{body}"}
+            ],
+            temperature=0.1,
+            max_tokens=SKILLS_OUTPUT_TOKENS_PER_JOB * len(pack) + 32
+        )
+        choice = response.choices[0]
+        try:
+            if choice.finish_reason == "length":
+                raise ValueError("输出被截断")
+            parsed = parse_skills_json(choice.message.content, set(local_ids))
+        except ValueError as e:
+            logger.warning(f"⚠️ 批量技能提取失败 ({len(pack)} 个职位)，拆成两半重试: {e}")
+            half = len(pack) // 2
+            return {**self.extract_skills_pack(pack[:half]), **self.extract_skills_pack(pack[half:])}
+
+        results = {local_ids[local_id][0]: skills for local_id, skills in parsed.items()}
+        missing = [job for local_id, job in local_ids.items() if local_id not in parsed]
+        if missing:
+            logger.warning(f"⚠️ {len(missing)}/{len(pack)} 个职位的批量结果无效，逐个重试")
+            for job_id, description in missing:
+                results.update(self._extract_one(job_id, description))
+        return results
+
+    def _extract_one(self, job_id, description):
+        skills = self._extract_skills_text(description)
+        return {job_id: skills} if skills else {}
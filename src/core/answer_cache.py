@@ -0,0 +1,114 @@
+# /chat 的语义回答缓存：新问题的向量和某个缓存问题足够接近 (余弦相似度)，且向量表版本没变，就直接返回缓存的回答
+import time
+from collections import OrderedDict
+import numpy as np
+from src.config import Config
+
+
+class SemanticAnswerCache:
+    """
+    - 命中条件: cos(新问题, 缓存问题) >= threshold，且缓存时的 LanceDB 表版本 == 当前版本
+      (表版本变了说明职位数据有更新，检索结果可能不同，旧回答作废)
+    - 过期: 写入后 ttl 秒失效
+    - 容量: 最多 max_entries 条，满了淘汰最近最少使用的
+    所有向量放在一个预分配的矩阵里，查找是一次矩阵乘法 (1000 条 x 1024 维 < 1ms)。
+    只在事件循环里使用 (AsyncAIClient)，不加锁。
+    """
+
+    def __init__(self, threshold=None, ttl=None, max_entries=None):
+        self.threshold = Config.CHAT_CACHE_THRESHOLD if threshold is None else threshold
+        self.ttl = Config.CHAT_CACHE_TTL if ttl is None else ttl
+        self.max_entries = Config.CHAT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+
+        self._vectors = None  # (max_entries, dim)，第一次写入时按维度分配
+        self._versions = np.full(self.max_entries, -1, dtype=np.int64)
+        self._expires = np.zeros(self.max_entries)
+        self._entries = [None] * self.max_entries
+        self._lru = OrderedDict()  # slot -> None，按最近使用排序
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def get(self, vector, table_version):
+        """命中返回 {"query", "reply", "context", "similarity"}，否则 None"""
+        if vector is None or table_version is None or self._vectors is None or not self._lru:
+            self.misses += 1
+            return None
+
+        q = self._normalize(vector)
+        if q.shape[0] != self._vectors.shape[1]:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        sims = self._vectors @ q
+        valid = (self._versions == table_version) & (self._expires > now)
+        sims[~valid] = -np.inf
+        slot = int(np.argmax(sims))
+        if sims[slot] < self.threshold:
+            self.misses += 1
+            return None
+
+        self._lru.move_to_end(slot)
+        self.hits += 1
+        return dict(self._entries[slot], similarity=float(sims[slot]))
+
+    def put(self, vector, table_version, query, reply, context=None):
+        if vector is None or table_version is None or self.max_entries <= 0:
+            return
+        q = self._normalize(vector)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, q.shape[0]), dtype=np.float32)
+        elif q.shape[0] != self._vectors.shape[1]:
+            return  # 换了向量模型，维度不同的不缓存
+
+        if not self._free:
+            self._purge_expired()
+        if not self._free:
+            oldest, _ = self._lru.popitem(last=False)
+            self._release(oldest)
+            self.evictions += 1
+
+        slot = self._free.pop()
+        self._vectors[slot] = q
+        self._versions[slot] = table_version
+        self._expires[slot] = time.time() + self.ttl
+        self._entries[slot] = {"query": query, "reply": reply, "context": context}
+        self._lru[slot] = None
+
+    def _release(self, slot):
+        self._versions[slot] = -1
+        self._expires[slot] = 0
+        self._vectors[slot] = 0
+        self._entries[slot] = None
+        self._free.append(slot)
+
+    def _purge_expired(self):
+        now = time.time()
+        for slot in [s for s in self._lru if self._expires[s] <= now]:
+            del self._lru[slot]
+            self._release(slot)
+
+    def clear(self):
+        for slot in list(self._lru):
+            self._release(slot)
+        self._lru.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._lru),
+            "evictions": self.evictions,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,221 @@
+# 异步 AI 客户端 (API 进程用)：AsyncOpenAI + LanceDB 异步 API，LLM 调用不再占用线程池
+import asyncio
+import time
+from src.config import Config
+from src.core.ai_client import AIClient, CHAT_MODEL, NO_RESULTS_REPLY
+from src.core.answer_cache import SemanticAnswerCache
+from src.core.embedder import AsyncEmbedder
+from src.core.logger import setup_logger
+from src.core.metrics import LatencyTracker
+from src.core.openai_client import create_async_openai_client
+from src.core.upstream import UpstreamLimit
+from src.core.vector_store import AsyncVectorStore
+
+logger = setup_logger("AsyncAIClient")
+
+
+class AsyncAIClient:
+    """
+    AIClient 的异步版本
+    由 FastAPI 的 lifespan 创建一个全局实例，所有请求共用：
+    HTTP 连接池、向量库连接和已打开的表句柄都只初始化一次。
+    每个上游 (对话 / 向量生成 / 向量检索) 有独立的并发上限和超时，见 Config.AI_*_MAX_INFLIGHT。
+    """
+
+    def __init__(self):
+        # 流式对话的首 token 延迟 (从收到请求算起，包含检索) 和总耗时
+        self.ttft = LatencyTracker("chat_ttft")
+        self.stream_total = LatencyTracker("chat_stream_total")
+        self.chat_limit = UpstreamLimit("chat", Config.AI_CHAT_MAX_INFLIGHT, Config.AI_CHAT_TIMEOUT)
+        # 相似问题直接复用之前的回答 (向量表有更新时自动失效)
+        self.answer_cache = SemanticAnswerCache() if Config.CHAT_CACHE_ENABLED else None
+
+        if not Config.AI_API_KEY:
+            logger.warning("⚠️ 未配置 AI_API_KEY，AI 功能将不可用")
+            self.client = None
+            return
+
+        self.client = create_async_openai_client()
+        self.chat_model = CHAT_MODEL
+        self.embedder = AsyncEmbedder(client=self.client, model=Config.EMBEDDING_MODEL)
+        self.vector_store = AsyncVectorStore(embedder=self.embedder)
+
+    async def warm_up(self):
+        """
+        启动预热：打开向量表 (预加载索引)、建立到 AI 接口的长连接，
+        把这些一次性开销挪到启动阶段，而不是落在第一个用户请求上
+        """
+        if not self.client:
+            return
+        try:
+            rows = await self.vector_store.warm_up()
+            logger.info(f"🔥 向量表已就绪 ({rows} 行)")
+        except Exception as e:
+            logger.warning(f"⚠️ 向量表预热失败: {e}")
+        try:
+            # 一个轻量的 GET /models，把 TLS 连接建好放进连接池
+            await self.client.models.list()
+            logger.info("🔥 AI 接口连接已建立")
+        except Exception as e:
+            logger.warning(f"⚠️ AI 接口预热失败: {e}")
+
+    async def aclose(self):
+        """释放连接池 (应用关闭时调用)"""
+        if self.client:
+            await self.client.close()
+
+    def metrics(self):
+        limits = [self.chat_limit]
+        if self.client:
+            limits += [self.embedder.limit, self.vector_store.limit]
+        return {
+            "ttft": self.ttft.snapshot(),
+            "stream_total": self.stream_total.snapshot(),
+            "upstreams": [limit.stats() for limit in limits],
+            "answer_cache": self.answer_cache.stats() if self.answer_cache else None,
+        }
+
+    async def retrieve(self, user_query, top_k=5, query_vector=None, filters=None):
+        """:param filters: 元数据过滤条件，见 vector_store.build_where"""
+        if Config.RETRIEVAL_MODE == "hybrid":
+            return await self.vector_store.hybrid_search(
+                user_query, top_k=top_k, filters=filters, query_vector=query_vector
+            )
+        return await self.vector_store.search(user_query, top_k=top_k, filters=filters, query_vector=query_vector)
+
+    async def _lookup_cache(self, user_query, filters=None):
+        """
+        先算问题向量 (检索本来就要算)，再查语义缓存
+        带过滤条件的问题不走缓存 (缓存只按问题向量匹配，不区分过滤条件)
+        :return: (问题向量, 表版本, 命中的缓存条目或 None)
+        """
+        if not self.answer_cache or filters:
+            return None, None, None
+        vector = await self.embedder.embed(user_query)
+        version = await self.vector_store.table_version()
+        return vector, version, self.answer_cache.get(vector, version)
+
+    async def chat_with_jobs(self, user_query, filters=None):
+        """
+        RAG：先搜向量库，再问 AI (一次性返回完整回答)
+        :param filters: 可选的检索过滤条件 {"job_type", "budget_min", "budget_max"}
+        """
+        if not self.client:
+            return "AI 服务未初始化"
+
+        try:
+            vector, version, cached = await self._lookup_cache(user_query, filters)
+            if cached:
+                return cached["reply"]
+            results = await self.retrieve(user_query, query_vector=vector, filters=filters)
+        except Exception as e:
+            logger.error(f"向量检索失败: {e}")
+            return f"AI 思考超时或出错: {e}"
+        if not results:
+            return NO_RESULTS_REPLY
+
+        try:
+            # 只有排队受 AI_CHAT_TIMEOUT 约束；生成完整回答本身可能很久，单独用 AI_CHAT_TOTAL_TIMEOUT 兜底
+            async with self.chat_limit.slot():
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.chat_model,
+                        messages=AIClient.build_messages(user_query, results),
+                        temperature=0.7
+                    ),
+                    Config.AI_CHAT_TOTAL_TIMEOUT
+                )
+            reply = response.choices[0].message.content
+            if self.answer_cache and not filters:
+                self.answer_cache.put(vector, version, user_query, reply, AIClient.summarize_results(results))
+            return reply
+        except asyncio.TimeoutError:
+            logger.error(f"RAG 生成超时 ({Config.AI_CHAT_TOTAL_TIMEOUT:.0f}s)")
+            return f"AI 思考超时或出错: 生成超过 {Config.AI_CHAT_TOTAL_TIMEOUT:.0f}s"
+        except Exception as e:
+            logger.error(f"RAG 生成失败: {e}")
+            return f"AI 思考超时或出错: {e}"
+
+    async def stream_chat_with_jobs(self, user_query, filters=None):
+        """
+        流式 RAG：先产出检索结果，再逐个产出模型生成的 token (filters 同 chat_with_jobs)
+        依次产出 (event, data)：
+            ("context", [职位摘要...]) -> ("token", "文本片段")... -> ("done", {"ttft_ms", "total_ms"})
+        出错时产出 ("error", "原因") 并结束。
+        客户端断开时调用方关闭 (aclose / 取消) 这个生成器，上游连接随之关闭。
+        """
+        start = time.perf_counter()
+        if not self.client:
+            yield "error", "AI 服务未初始化"
+            return
+
+        try:
+            vector, version, cached = await self._lookup_cache(user_query, filters)
+            if cached:
+                # 命中语义缓存：一次性把之前的回答发出去
+                yield "context", cached["context"]
+                yield "token", cached["reply"]
+                elapsed = time.perf_counter() - start
+                self.ttft.observe(elapsed)
+                self.stream_total.observe(elapsed)
+                yield "done", {
+                    "ttft_ms": round(elapsed * 1000, 1),
+                    "total_ms": round(elapsed * 1000, 1),
+                    "cached": True,
+                    "similarity": round(cached["similarity"], 4),
+                }
+                return
+            results = await self.retrieve(user_query, query_vector=vector, filters=filters)
+        except Exception as e:
+            logger.error(f"向量检索失败: {e}")
+            yield "error", f"AI 思考超时或出错: {e}"
+            return
+        context = AIClient.summarize_results(results)
+        yield "context", context
+
+        ttft = None
+        tokens = []
+        if not results:
+            yield "token", NO_RESULTS_REPLY
+        else:
+            try:
+                # 整个流式响应期间占用一个对话名额；拿到响应头之前受 AI_CHAT_TIMEOUT 约束
+                async with self.chat_limit.slot():
+                    stream = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=self.chat_model,
+                            messages=AIClient.build_messages(user_query, results),
+                            temperature=0.7,
+                            stream=True
+                        ),
+                        self.chat_limit.timeout
+                    )
+                    try:
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if not delta:
+                                continue
+                            if ttft is None:
+                                ttft = time.perf_counter() - start
+                                self.ttft.observe(ttft)
+                            tokens.append(delta)
+                            yield "token", delta
+                    finally:
+                        # 关闭底层 HTTP 响应：提前结束 (客户端断开) 时上游也会停止生成
+                        await stream.close()
+            except Exception as e:
+                logger.error(f"RAG 流式生成失败: {e}")
+                yield "error", f"AI 思考超时或出错: {e}"
+                return
+
+        # 完整生成完才写缓存 (中途断开的不算)
+        if tokens and self.answer_cache and not filters:
+            self.answer_cache.put(vector, version, user_query, "".join(tokens), context)
+
+        total = time.perf_counter() - start
+        self.stream_total.observe(total)
+        yield "done", {
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "total_ms": round(total * 1000, 1),
+            "cached": False,
+        }
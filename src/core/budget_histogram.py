@@ -0,0 +1,47 @@
+# 预算的对数分桶直方图：job_stats 表用它增量维护近似分位数 (合并 = 按桶相加，可以在 SQL 里做)
+import math
+
+BUCKETS_PER_DECADE = 10  # 每个 10 倍区间 10 个桶，相邻桶边界差约 26%
+MAX_DECADES = 6  # 覆盖 $1 ~ $1,000,000，更大的都算进最后一个桶
+NUM_BUCKETS = BUCKETS_PER_DECADE * MAX_DECADES
+
+
+def bucket_index(value):
+    """第 i 个桶覆盖 [10^(i/10), 10^((i+1)/10))；SQL 版见 storage/postgres.py 的 _budget_bucket_sql"""
+    if value <= 1:
+        return 0
+    return min(int(math.log10(value) * BUCKETS_PER_DECADE), NUM_BUCKETS - 1)
+
+
+def empty_histogram():
+    return [0] * NUM_BUCKETS
+
+
+def bucket_bounds(i):
+    return 10 ** (i / BUCKETS_PER_DECADE), 10 ** ((i + 1) / BUCKETS_PER_DECADE)
+
+
+def percentile(histogram, q, lo=None, hi=None):
+    """
+    近似分位数：找到累计计数跨过 q 的桶，在桶内按对数线性插值
+    :param lo/hi: 已知的精确最小 / 最大值，用来收紧结果
+    """
+    total = sum(histogram or [])
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= target:
+            left, right = bucket_bounds(i)
+            frac = (target - seen) / count
+            value = left * (right / left) ** frac
+            break
+        seen += count
+    else:
+        value = bucket_bounds(len(histogram) - 1)[1]
+    if lo is not None:
+        value = max(value, lo)
+    if hi is not None:
+        value = min(value, hi)
+    return round(value, 2)
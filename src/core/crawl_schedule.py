@@ -0,0 +1,33 @@
+# 自适应抓取间隔的计算规则 (crawl_scheduler 和 scrape_upwork 共用)
+from src.config import Config
+
+YIELD_ALPHA = 0.3  # EWMA 平滑系数：越大越快跟上最近几次抓取的变化
+
+
+def ewma(old, value, alpha=YIELD_ALPHA):
+    return value if old is None else alpha * value + (1 - alpha) * old
+
+
+def ideal_interval(rate_per_hour):
+    """
+    目标: 每次抓取大约拿到 CRAWL_TARGET_NEW_JOBS 个新职位
+    间隔 = 目标数 / 每小时新增数，限制在 [CRAWL_MIN_INTERVAL, CRAWL_MAX_INTERVAL]
+    """
+    if rate_per_hour is None:
+        return Config.CRAWL_DEFAULT_INTERVAL
+    if rate_per_hour <= 0:
+        return Config.CRAWL_MAX_INTERVAL
+    seconds = Config.CRAWL_TARGET_NEW_JOBS / rate_per_hour * 3600
+    return int(min(max(seconds, Config.CRAWL_MIN_INTERVAL), Config.CRAWL_MAX_INTERVAL))
+
+
+def budget_scale(keywords):
+    """
+    所有关键词按当前间隔抓取时每小时要加载多少页；超过 CRAWL_PAGE_BUDGET_PER_HOUR 时，
+    返回 > 1 的系数，把所有间隔按同一比例拉长 (各关键词之间的相对频率不变)
+    :param keywords: CrawlKeyword 列表 (只算启用的)
+    """
+    demand = sum(max(kw.pages_ewma or 1.0, 1.0) * 3600 / kw.interval_seconds for kw in keywords)
+    if Config.CRAWL_PAGE_BUDGET_PER_HOUR <= 0:
+        return 1.0
+    return max(1.0, demand / Config.CRAWL_PAGE_BUDGET_PER_HOUR)
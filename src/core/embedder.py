@@ -0,0 +1,150 @@
+# 统一的向量生成入口：批量 + 并发 + 重试 + 缓存 (VectorStore 和 AIClient 共用)
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import random
+import time
+from src.config import Config
+from src.core.embedding_cache import get_embedding_cache
+from src.core.logger import setup_logger
+from src.core.openai_client import create_openai_client
+from src.core.upstream import UpstreamLimit
+
+logger = setup_logger("Embedder")
+
+
+class Embedder:
+    def __init__(self, client=None, model=None, cache=None):
+        self.client = client or create_openai_client()
+        self.model = model or Config.EMBEDDING_MODEL
+        self.cache = cache if cache is not None else get_embedding_cache()
+
+    def _embed_batch(self, texts):
+        """一个请求生成一批向量，失败按指数退避重试，最终失败抛出异常"""
+        for attempt in range(Config.EMBED_MAX_RETRIES + 1):
+            try:
+                response = self.client.embeddings.create(
+                    input=texts,
+                    model=self.model
+                )
+                # 按 index 排序，保证和输入顺序一致
+                return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+            except Exception as e:
+                if attempt == Config.EMBED_MAX_RETRIES:
+                    raise
+                delay = 2 ** attempt + random.uniform(0, 1)
+                logger.warning(f"⚠️ Embedding 批次失败 ({len(texts)} 条)，{delay:.1f}s 后重试 "
+                               f"({attempt + 1}/{Config.EMBED_MAX_RETRIES}): {e}")
+                time.sleep(delay)
+
+    def _embed_remote(self, texts):
+        size = Config.EMBED_BATCH_SIZE
+        batches = [(i, texts[i:i + size]) for i in range(0, len(texts), size)]
+        vectors = [None] * len(texts)
+
+        def work(batch):
+            start, chunk = batch
+            try:
+                return start, self._embed_batch(chunk)
+            except Exception as e:
+                logger.error(f"❌ Embedding 失败 (第 {start}~{start + len(chunk) - 1} 条): {e}")
+                return start, None
+
+        with ThreadPoolExecutor(max_workers=max(1, Config.EMBED_CONCURRENCY)) as executor:
+            for start, result in executor.map(work, batches):
+                if result:
+                    vectors[start:start + len(result)] = result
+
+        return vectors
+
+    def embed_texts(self, texts):
+        """
+        批量生成向量 (先查缓存，只把没命中的文本发给 API)
+        :return: 与 texts 等长的列表，生成失败的位置为 None (不再用全 0 向量顶替)
+        """
+        texts = [t.replace("\n", " ") for t in texts]
+        vectors = self.cache.get_many(self.model, texts) if self.cache else [None] * len(texts)
+
+        # 没命中的文本去重后再请求
+        missing = {}
+        for i, (text, vector) in enumerate(zip(texts, vectors)):
+            if vector is None:
+                missing.setdefault(text, []).append(i)
+        if not missing:
+            return vectors
+
+        todo = list(missing)
+        fresh = self._embed_remote(todo)
+        for text, vector in zip(todo, fresh):
+            for i in missing[text]:
+                vectors[i] = vector
+        if self.cache:
+            self.cache.put_many(self.model, todo, fresh)
+
+        return vectors
+
+    def embed(self, text):
+        """单条文本，失败返回 None"""
+        return self.embed_texts([text])[0]
+
+
+class AsyncEmbedder:
+    """
+    Embedder 的异步版本 (API 进程用，基于 AsyncOpenAI)
+    同样先查共享缓存；SQLite 读写放到线程里，不阻塞事件循环
+    """
+
+    def __init__(self, client, model=None, cache=None, limit=None):
+        self.client = client
+        self.model = model or Config.EMBEDDING_MODEL
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.limit = limit or UpstreamLimit("embeddings", Config.AI_EMBED_MAX_INFLIGHT, Config.AI_EMBED_TIMEOUT)
+
+    async def _create(self, texts):
+        response = await self.client.embeddings.create(input=texts, model=self.model)
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+    async def _embed_batch(self, texts):
+        for attempt in range(Config.EMBED_MAX_RETRIES + 1):
+            try:
+                return await self.limit.call(self._create, texts)
+            except Exception as e:
+                if attempt == Config.EMBED_MAX_RETRIES:
+                    logger.error(f"❌ Embedding 失败 ({len(texts)} 条): {e}")
+                    return None
+                delay = 2 ** attempt + random.uniform(0, 1)
+                logger.warning(f"⚠️ Embedding 批次失败 ({len(texts)} 条)，{delay:.1f}s 后重试 "
+                               f"({attempt + 1}/{Config.EMBED_MAX_RETRIES}): {e}")
+                await asyncio.sleep(delay)
+
+    async def embed_texts(self, texts):
+        """与 Embedder.embed_texts 相同：返回等长列表，失败的位置为 None"""
+        texts = [t.replace("\n", " ") for t in texts]
+        if self.cache:
+            vectors = await asyncio.to_thread(self.cache.get_many, self.model, texts)
+        else:
+            vectors = [None] * len(texts)
+
+        missing = {}
+        for i, (text, vector) in enumerate(zip(texts, vectors)):
+            if vector is None:
+                missing.setdefault(text, []).append(i)
+        if not missing:
+            return vectors
+
+        todo = list(missing)
+        size = Config.EMBED_BATCH_SIZE
+        batches = await asyncio.gather(*(self._embed_batch(todo[i:i + size]) for i in range(0, len(todo), size)))
+        fresh = []
+        for i, result in zip(range(0, len(todo), size), batches):
+            fresh += result or [None] * len(todo[i:i + size])
+
+        for text, vector in zip(todo, fresh):
+            for i in missing[text]:
+                vectors[i] = vector
+        if self.cache:
+            await asyncio.to_thread(self.cache.put_many, self.model, todo, fresh)
+        return vectors
+
+    async def embed(self, text):
+        """单条文本，失败返回 None"""
+        return (await self.embed_texts([text]))[0]
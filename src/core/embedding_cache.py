@@ -0,0 +1,162 @@
+# 向量缓存：进程内 LRU + 本地 SQLite，key = (模型, 归一化文本的 hash)
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from src.config import Config
+from src.core.logger import setup_logger
+
+logger = setup_logger("EmbeddingCache")
+
+
+def normalize_text(text):
+    """归一化：合并所有空白字符 (换行、连续空格)，首尾去空"""
+    return " ".join(text.split())
+
+
+def cache_key(model, text):
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    两级缓存
+    1. 内存 LRU (memory_size 条)，命中不产生任何 IO；向量存成 array('f') (float32)，
+       内存约为 Python float 列表的 1/8，只在 get_many 返回时才转成列表
+    2. SQLite (max_entries 条)，超出后按最近使用时间淘汰最旧的 10%
+    线程安全 (Embedder 会在线程池里并发写入)。
+    """
+
+    def __init__(self, path=None, memory_size=None, max_entries=None):
+        self.path = path or Config.EMBED_CACHE_PATH
+        self.memory_size = Config.EMBED_CACHE_MEMORY_SIZE if memory_size is None else memory_size
+        self.max_entries = Config.EMBED_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, model TEXT, vector BLOB, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._disk_count = self._conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+
+    # --- 内存层 ---
+    def _remember(self, key, vector):
+        """vector 为 array('f')"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model, texts):
+        """返回与 texts 等长的列表，未命中的位置为 None"""
+        keys = [cache_key(model, t) for t in texts]
+        results = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector.tolist()
+                    self.hits_memory += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing:
+                found = self._load(list(missing))
+                for key, vector in found.items():
+                    self._remember(key, vector)
+                    for i in missing[key]:
+                        results[i] = vector.tolist()
+                    self.hits_disk += len(missing[key])
+                self.misses += sum(len(idx) for key, idx in missing.items() if key not in found)
+
+        return results
+
+    def put_many(self, model, texts, vectors):
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if vector is None:
+                    continue
+                key = cache_key(model, text)
+                packed = array("f", vector)
+                self._remember(key, packed)
+                rows.append((key, model, packed.tobytes(), now))
+            if not rows:
+                return
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self._disk_count += self._conn.total_changes - before
+            if self._disk_count > self.max_entries:
+                self._evict()
+
+    # --- 磁盘层 ---
+    def _load(self, keys):
+        found = {}
+        for i in range(0, len(keys), 500):  # SQLite 绑定参数个数有上限
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, blob in self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+            ):
+                found[key] = array("f", blob)
+        if found:
+            # 刷新最近使用时间，淘汰时优先删冷数据
+            now = time.time()
+            self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self._conn.commit()
+        return found
+
+    def _evict(self):
+        n = max(1, self._disk_count - int(self.max_entries * 0.9))
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (n,)
+        )
+        self._conn.commit()
+        self._disk_count = self._conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        logger.info(f"🧹 向量缓存淘汰 {n} 条，剩余 {self._disk_count} 条")
+
+    def stats(self):
+        total = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / total if total else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_count,
+        }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """进程内共享的缓存实例 (VectorStore 和 AIClient 共用同一个 LRU)"""
+    global _shared_cache
+    if not Config.EMBED_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache()
+        return _shared_cache
@@ -0,0 +1,23 @@
+# 混合检索的结果融合：Reciprocal Rank Fusion (RRF)
+# score(d) = Σ weight_i / (k + rank_i(d))，只看名次不看原始分数，向量距离和 BM25 分数不用归一化就能合并
+
+
+def reciprocal_rank_fusion(ranked_lists, k=60, top_k=None, weights=None):
+    """
+    :param ranked_lists: 多路检索结果，每一路是按相关度排好序的 list[dict] (都带 "id")
+    :param k: RRF 平滑常数 (越大，排名靠后的结果权重衰减越慢)
+    :param weights: 每一路的权重，默认都是 1
+    :return: 融合后的 list[dict]，每条带 "_rrf" 分数；同一个 id 保留它第一次出现时的那条记录
+    """
+    weights = weights or [1.0] * len(ranked_lists)
+    scores, rows = {}, {}
+    for results, weight in zip(ranked_lists, weights):
+        for rank, row in enumerate(results, start=1):
+            doc_id = row["id"]
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+            rows.setdefault(doc_id, row)
+
+    fused = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    if top_k is not None:
+        fused = fused[:top_k]
+    return [dict(rows[doc_id], _rrf=scores[doc_id]) for doc_id in fused]
@@ -0,0 +1,35 @@
+# 进程内的轻量指标：滑动窗口延迟分位数 (API 进程里由共享的 AIClient 持有)
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    """保留最近 window 次观测，给出 p50 / p95 / p99 (毫秒)"""
+
+    def __init__(self, name, window=1000):
+        self.name = name
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds * 1000)
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"name": self.name, "count": self.count}
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 1)
+
+        return {
+            "name": self.name,
+            "count": self.count,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+        }
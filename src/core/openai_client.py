@@ -0,0 +1,39 @@
+# 创建 OpenAI 兼容客户端：显式配置 HTTP 连接池 (keep-alive)，长期存活的进程里应该只建一个并复用
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from src.config import Config
+
+
+def create_openai_client():
+    """
+    底层 httpx 连接池在客户端的整个生命周期内复用，
+    所以不要每个请求 new 一个 (每次都要重新握手 TLS)
+    """
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=Config.AI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.AI_HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(Config.AI_HTTP_TIMEOUT, connect=10.0),
+    )
+    return OpenAI(
+        api_key=Config.AI_API_KEY,
+        base_url=Config.AI_BASE_URL,
+        http_client=http_client,
+    )
+
+
+def create_async_openai_client():
+    """异步版本 (API 进程用)，同样只建一个、所有请求复用"""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=Config.AI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.AI_HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(Config.AI_HTTP_TIMEOUT, connect=10.0),
+    )
+    return AsyncOpenAI(
+        api_key=Config.AI_API_KEY,
+        base_url=Config.AI_BASE_URL,
+        http_client=http_client,
+    )
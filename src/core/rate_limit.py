@@ -0,0 +1,70 @@
+# 令牌桶限流：同时遵守服务商的 RPM (每分钟请求数) 和 TPM (每分钟 token 数) 限制，线程安全
+import threading
+import time
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数 (英文约 4 字符 / token，中文约 1~2 字符 / token，这里取偏保守的 3)"""
+    return len(text) // 3 + 1
+
+
+class TokenBucket:
+    """容量 = 每分钟额度，按 额度/60 每秒匀速补充；rate_per_minute <= 0 表示不限"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.refill_per_sec = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self):
+        return self.capacity <= 0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """还要等多久才够 amount 个令牌 (秒)"""
+        if self.unlimited or self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_sec
+
+
+class RateLimiter:
+    """
+    RPM + TPM 两个令牌桶
+    用法: 调用前 reserved = acquire(估算的 token 数)，拿到响应后 settle(reserved, 实际 usage) 多退少补
+    """
+
+    def __init__(self, rpm=0, tpm=0):
+        self.requests = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=0):
+        """阻塞直到请求数和 token 额度都够用，返回实际预留的 token 数"""
+        if not self.token_bucket.unlimited:
+            # 单个请求超过整分钟额度时按满额度算，否则永远等不到
+            tokens = min(tokens, self.token_bucket.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.token_bucket.refill(now)
+                wait = max(self.requests.wait_time(1), self.token_bucket.wait_time(tokens))
+                if wait <= 0:
+                    if not self.requests.unlimited:
+                        self.requests.tokens -= 1
+                    if not self.token_bucket.unlimited:
+                        self.token_bucket.tokens -= tokens
+                    return tokens
+            time.sleep(min(wait, 1.0))
+
+    def settle(self, reserved, actual):
+        """按实际消耗修正 TPM 桶 (可以欠账，欠的额度会让后面的请求多等一会儿)"""
+        if actual is None or self.token_bucket.unlimited:
+            return
+        with self._lock:
+            self.token_bucket.tokens += reserved - actual
@@ -0,0 +1,33 @@
+# 词频统计的分词规则 (入库时统计、回填脚本、Dashboard 共用同一套，结果才一致)
+import re
+from collections import Counter
+
+MIN_TERM_LENGTH = 4  # 太短的词 (and / for / api ...) 基本没有信息量
+MAX_TERM_LENGTH = 50  # 更长的一般是链接、哈希这类噪声 (也放不进 term_stats.term)
+
+# 停用词：英文虚词 + 招聘描述里到处都是的套话
+STOPWORDS = frozenset("""
+the and to of a in for is on with we are looking
+this that will have from your you our be an or as at by it not can all any
+also into more than then them they their there these those which who what when where
+would should could about after before other some such only very just like well
+need needs needed must able work working help want make using used use
+project projects job jobs experience experienced please thanks thank hello
+""".split())
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """小写、按单词切分，去掉停用词、纯数字和过短 / 过长的词"""
+    if not text:
+        return []
+    return [
+        w for w in _TOKEN_RE.findall(text.lower())
+        if MIN_TERM_LENGTH <= len(w) <= MAX_TERM_LENGTH and w not in STOPWORDS and not w.isdigit()
+    ]
+
+
+def term_counts(text):
+    """一段文本的 {词: 出现次数}"""
+    return Counter(tokenize(text))
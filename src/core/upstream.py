@@ -0,0 +1,65 @@
+# 异步路径里每个上游 (对话 / 向量生成 / 向量检索) 的并发上限 + 超时
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class UpstreamTimeout(Exception):
+    """排队或调用超过了该上游的超时时间"""
+
+
+class UpstreamLimit:
+    """
+    用信号量限制同时在途的请求数，超出的请求排队；
+    排队 + 调用的总时间超过 timeout 抛 UpstreamTimeout。
+    一个慢上游最多占住 max_inflight 个请求，不会拖垮其他接口。
+    """
+
+    def __init__(self, name, max_inflight, timeout):
+        self.name = name
+        self.max_inflight = max_inflight
+        self.timeout = timeout
+        self._sem = asyncio.Semaphore(max_inflight)
+        self.inflight = 0
+        self.timeouts = 0
+
+    async def _acquire(self, timeout):
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise UpstreamTimeout(f"{self.name} 排队超时 ({self.timeout}s)") from None
+        self.inflight += 1
+
+    def _release(self):
+        self.inflight -= 1
+        self._sem.release()
+
+    async def call(self, fn, *args, **kwargs):
+        """await fn(*args, **kwargs)，受并发上限和超时约束"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        await self._acquire(self.timeout)
+        try:
+            return await asyncio.wait_for(fn(*args, **kwargs), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise UpstreamTimeout(f"{self.name} 超时 ({self.timeout}s)") from None
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """长时间占用一个名额 (流式响应)，只有排队受 timeout 约束"""
+        await self._acquire(self.timeout)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "timeouts": self.timeouts,
+        }
@@ -1,53 +1,256 @@
 import lancedb
 from src.config import Config
-from openai import OpenAI
+from src.core.embedder import Embedder
+from src.core.hybrid import reciprocal_rank_fusion
+from src.core.upstream import UpstreamLimit, UpstreamTimeout
 from src.core.logger import setup_logger
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import asyncio
+import hashlib
+import json
 import os
+import time
 
 logger = setup_logger("VectorStore")
 
 
+# 当前版本的表必须有这些列，缺了就是旧表，需要重建
+REQUIRED_COLUMNS = ("content_hash", "budget_value")
+
+
+def content_hash(text, meta=None):
+    """
+    职位的内容指纹，用来判断这一行要不要重新同步
+    除了文本也包括元数据 (预算 / 类型是检索时的过滤条件)：只有元数据变了也会重写，
+    文本没变的向量直接命中向量缓存，不会重新调用 embeddings 接口
+    """
+    payload = text if not meta else f"{text}\0{json.dumps(meta, sort_keys=True, default=str)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _where_clauses(filters):
+    """过滤条件 -> [(用到的列, SQL 条件)]"""
+    if not filters:
+        return []
+    clauses = []
+    if filters.get("job_type"):
+        job_type = str(filters["job_type"]).replace("'", "''")
+        clauses.append(("type", f"type = '{job_type}'"))
+    if filters.get("budget_min") is not None:
+        clauses.append(("budget_value", f"budget_value >= {int(filters['budget_min'])}"))
+    if filters.get("budget_max") is not None:
+        clauses.append(("budget_value", f"budget_value <= {int(filters['budget_max'])}"))
+    return clauses
+
+
+def build_where(filters):
+    """
+    把元数据过滤条件转成 LanceDB 的 SQL where 子句
+    filters: {"job_type": "Hourly", "budget_min": 100, "budget_max": 5000}，None 值忽略
+    """
+    return " AND ".join(clause for _, clause in _where_clauses(filters)) or None
+
+
+def table_where(filters, column_names):
+    """
+    build_where + 表结构检查 (向量检索和全文检索共用，保证两路行为一致)：
+    旧版表缺少某个过滤列 (比如 budget_value) 时只忽略用到这一列的条件并记警告，其余条件照常生效
+    """
+    clauses = _where_clauses(filters)
+    missing = sorted({column for column, _ in clauses if column not in column_names})
+    if missing:
+        logger.warning(f"⚠️ 向量表是旧版结构，缺少 {', '.join(missing)} 列，忽略相关过滤条件，请重新运行 sync_vectors")
+    return " AND ".join(clause for column, clause in clauses if column in column_names) or None
+
+
+def build_vector_index(tbl, index_type=None, metric=None):
+    """
+    在 vector 列上建 (或重建) ANN 索引，并给过滤列建标量索引
+    每个 IVF 分区约 4096 行 (分区太小 KMeans 训练样本不够)，PQ 子向量数取 维度/16 (bge-m3: 1024 维 => 64)
+    """
+    index_type = index_type or Config.VECTOR_INDEX_TYPE
+    rows = tbl.count_rows()
+    dim = tbl.schema.field("vector").type.list_size
+    num_sub_vectors = max(1, dim // 16)
+    while dim % num_sub_vectors:
+        num_sub_vectors -= 1
+
+    tbl.create_index(
+        metric=metric or Config.VECTOR_METRIC,
+        num_partitions=max(1, rows // 4096),
+        num_sub_vectors=num_sub_vectors,
+        vector_column_name="vector",
+        index_type=index_type,
+        replace=True
+    )
+    # 过滤列的标量索引，让 where 预过滤不用全表扫描
+    if "type" in tbl.schema.names:
+        tbl.create_scalar_index("type", index_type="BITMAP", replace=True)
+    if "budget_value" in tbl.schema.names:
+        tbl.create_scalar_index("budget_value", index_type="BTREE", replace=True)
+
+
+def vector_query(tbl, vector, top_k=5, where=None, nprobes=None, refine_factor=None, exact=False):
+    """
+    构造一次向量查询
+    :param where: 元数据预过滤 (在 ANN 之前过滤，保证能返回 top_k 条满足条件的结果)
+    :param exact: True = 绕过索引做暴力扫描 (用于评估召回率)
+    """
+    query = tbl.search(vector).metric(Config.VECTOR_METRIC).limit(top_k)
+    if where:
+        query = query.where(where, prefilter=True)
+    if exact:
+        return query.bypass_vector_index()
+    query = query.nprobes(nprobes or Config.VECTOR_NPROBES)
+    refine_factor = Config.VECTOR_REFINE_FACTOR if refine_factor is None else refine_factor
+    if refine_factor:
+        query = query.refine_factor(refine_factor)
+    return query
+
+
+def async_vector_query(tbl, vector, top_k=5, where=None, nprobes=None, refine_factor=None, exact=False):
+    """vector_query 的异步 API 版本 (tbl 是 AsyncTable)；异步 API 的 where 默认就是预过滤"""
+    query = tbl.query().nearest_to(vector).distance_type(Config.VECTOR_METRIC).limit(top_k)
+    if where:
+        query = query.where(where)
+    if exact:
+        return query.bypass_vector_index()
+    query = query.nprobes(nprobes or Config.VECTOR_NPROBES)
+    refine_factor = Config.VECTOR_REFINE_FACTOR if refine_factor is None else refine_factor
+    if refine_factor:
+        query = query.refine_factor(refine_factor)
+    return query
+
+
+def has_fts_index(tbl):
+    return any(idx.index_type == "FTS" for idx in tbl.list_indices())
+
+
+def build_fts_index(tbl):
+    """在 text 列上建全文索引 (BM25)；之后新增的行没进索引也能搜到，optimize() 时合并进来"""
+    tbl.create_fts_index("text", replace=True)
+
+
+def fts_query(tbl, text, top_k=5, where=None):
+    """构造一次全文检索 (BM25)，结果带 _score"""
+    query = tbl.search(text, query_type="fts").limit(top_k)
+    if where:
+        query = query.where(where, prefilter=True)
+    return query
+
+
+def async_fts_query(tbl, text, top_k=5, where=None):
+    query = tbl.query().nearest_to_text(text).limit(top_k)
+    if where:
+        query = query.where(where)
+    return query
+
+
+def default_db_path():
+    return os.path.join(os.getcwd(), "data", "lancedb")
+
+
 class VectorStore:
-    def __init__(self):
-        # 1. 初始化 OpenAI
-        self.client = OpenAI(
-            api_key=Config.AI_API_KEY,
-            base_url=Config.AI_BASE_URL
-        )
+    def __init__(self, embedder=None, db_path=None):
+        # 1. 向量生成器 (可以和 AIClient 共用同一个)
+        self.embedder = embedder or Embedder()
 
         # 2. 初始化 LanceDB (本地文件数据库)
-        db_path = os.path.join(os.getcwd(), "data", "lancedb")
+        db_path = db_path or default_db_path()
         os.makedirs(db_path, exist_ok=True)
-        self.db = lancedb.connect(db_path)
+        # read_consistency_interval: 常驻的表句柄每隔 N 秒检查一次数据集版本，
+        # 其他进程 (sync_vectors) 写入的新版本会被自动加载，不用重新 open_table
+        self.db = lancedb.connect(
+            db_path, read_consistency_interval=timedelta(seconds=Config.VECTOR_REFRESH_SECONDS)
+        )
 
         # 3. 创建表 (如果不存在)
         # LanceDB 需要先定义 Schema，或者第一次 add 时自动推断
         # 这里我们用自动推断模式
         self.table_name = "upwork_jobs"
+        self._table = None
+        self._table_checked_at = float("-inf")
+
+
+    def _get_table(self, recheck=False):
+        """
+        返回常驻的表句柄，表不存在返回 None
+        表还没建的时候，查询路径上最多每 VECTOR_REFRESH_SECONDS 秒列一次目录，而不是每个请求都列；
+        recheck=True (写入 / 同步路径) 时总是重新检查
+        """
+        if self._table is None:
+            now = time.monotonic()
+            if not recheck and now - self._table_checked_at < Config.VECTOR_REFRESH_SECONDS:
+                return None
+            self._table_checked_at = now
+            if self.table_name in self.db.table_names():
+                self._table = self.db.open_table(self.table_name)
+        return self._table
+
+    def table_version(self):
+        """当前表的数据集版本号 (表不存在返回 None)"""
+        tbl = self._get_table()
+        return tbl.version if tbl is not None else None
+
+    def warm_up(self):
+        """预先打开表并读一次元数据，返回行数"""
+        tbl = self._get_table(recheck=True)
+        return tbl.count_rows() if tbl is not None else 0
 
     def _get_embedding(self, text):
-        """调用 OpenAI 获取向量"""
-        text = text.replace("\n", " ")
-        try:
-            return self.client.embeddings.create(
-                input=[text],
-                model=Config.EMBEDDING_MODEL  # 便宜又快
-            ).data[0].embedding
-        except Exception as e:
-            logger.error(f"❌ Embedding 失败: {e}")
-            return [0.0] * 1024 # 返回空向量防止崩盘
+        """获取单条向量 (走共享的 Embedder 和缓存)，失败返回 None"""
+        return self.embedder.embed(text)
+
+    def get_content_hashes(self):
+        """读取已入库职位的 {id: content_hash}，用于增量同步"""
+        tbl = self._get_table(recheck=True)
+        if tbl is None:
+            return {}
+        if not self._schema_ok(tbl):
+            # 老版本的表缺列 (例如没有内容指纹)，返回空 => 全部重新生成并覆盖
+            return {}
+        rows = tbl.search().select(["id", "content_hash"]).limit(None).to_arrow()
+        return dict(zip(rows.column("id").to_pylist(), rows.column("content_hash").to_pylist()))
+
+    @staticmethod
+    def _schema_ok(tbl):
+        return all(col in tbl.schema.names for col in REQUIRED_COLUMNS)
+
+    def _open_or_create(self, data):
+        """打开表；不存在 (或者是缺列的老表) 就用 data 建表，返回 (表, 是否新建)"""
+        tbl = self._get_table(recheck=True)
+        if tbl is not None:
+            if self._schema_ok(tbl):
+                return tbl, False
+            logger.warning(f"⚠️ 检测到旧版向量表 (缺少 {REQUIRED_COLUMNS} 中的列)，重建...")
+        self._table = self.db.create_table(self.table_name, data=data, mode="overwrite")
+        return self._table, True
 
     def add_jobs(self, jobs):
         """
-        jobs: list of dict [{'id':..., 'text':..., 'meta':...}]
+        按 id Upsert (merge-insert)，重复同步不会产生重复向量
+        jobs: list of dict [{'id':..., 'text':..., 'meta':..., 'hash': 可选}]
+        :return: 向量生成失败、被跳过的职位 id 列表 (没写入就没有指纹，下次同步自然会重试)
         """
-        if not jobs: return
+        if not jobs: return []
 
-        data_to_insert = []
         logger.info(f"⚡️ 正在生成 {len(jobs)} 个向量 (调用 API)...")
+        vectors = self.embedder.embed_texts([job['text'] for job in jobs])
 
-        for job in jobs:
-            vector = self._get_embedding(job['text'])
+        data_to_insert = []
+        failed_ids = []
+        for job, vector in zip(jobs, vectors):
+            if vector is None:
+                failed_ids.append(job['id'])
+                continue
             # LanceDB 要求扁平化结构
             item = {
                 "id": job['id'],
@@ -55,30 +258,208 @@ class VectorStore:
                 "text": job['text'],
                 "title": job['meta']['title'],
                 "budget": job['meta']['budget'],
-                "type": job['meta']['type']
+                "budget_value": _to_int(job['meta'].get('budget_value', job['meta']['budget'])),  # 数值版，用于范围过滤
+                "type": job['meta']['type'],
+                "content_hash": job.get('hash') or content_hash(job['text'], job['meta'])
             }
             data_to_insert.append(item)
 
+        if failed_ids:
+            logger.warning(f"⚠️ {len(failed_ids)} 个职位向量生成失败，已跳过，下次同步重试")
+
         try:
-            # 打开表 (如果不存在就创建)
-            if self.table_name in self.db.table_names():
-                tbl = self.db.open_table(self.table_name)
-                tbl.add(data_to_insert)
-            else:
-                self.db.create_table(self.table_name, data=data_to_insert)
+            if data_to_insert:
+                # 打开表 (如果不存在就创建)，已存在的 id 覆盖，新的插入
+                tbl, created = self._open_or_create(data_to_insert)
+                if not created:
+                    tbl.merge_insert("id") \
+                        .when_matched_update_all() \
+                        .when_not_matched_insert_all() \
+                        .execute(data_to_insert)
 
-            logger.info(f"✅ {len(jobs)} 条数据已存入 LanceDB")
+                logger.info(f"✅ {len(data_to_insert)} 条数据已存入 LanceDB")
         except Exception as e:
             logger.error(f"❌ 存储失败: {e}")
+            # 没存进去的也算失败，下次重试
+            failed_ids += [item['id'] for item in data_to_insert]
 
-    def search(self, query, top_k=5):
-        """语义搜索"""
-        if self.table_name not in self.db.table_names():
+        return failed_ids
+
+    # ==========================================
+    # ANN 索引管理
+    # ==========================================
+    def ensure_index(self, force=False):
+        """
+        行数超过 VECTOR_INDEX_MIN_ROWS 时建索引；
+        已有索引但新增的未索引行占比超过 VECTOR_REINDEX_RATIO 时重建
+        :return: 是否 (重)建了索引
+        """
+        tbl = self._get_table(recheck=True)
+        if tbl is None:
+            return False
+        # 全文索引不管表多大都要有 (混合检索的关键词那一路依赖它)
+        if force or not has_fts_index(tbl):
+            logger.info("🏗️ 正在构建全文索引 (text)...")
+            build_fts_index(tbl)
+
+        rows = tbl.count_rows()
+        if rows < Config.VECTOR_INDEX_MIN_ROWS and not force:
+            logger.info(f"ℹ️ 向量表只有 {rows} 行 (< {Config.VECTOR_INDEX_MIN_ROWS})，暴力扫描即可，不建索引")
+            return False
+
+        vector_index = next((idx for idx in tbl.list_indices() if "vector" in idx.columns), None)
+        if vector_index and not force:
+            stats = tbl.index_stats(vector_index.name)
+            unindexed = stats.num_unindexed_rows if stats else rows
+            if unindexed <= rows * Config.VECTOR_REINDEX_RATIO:
+                if unindexed:
+                    # 新增的少量行合并进现有索引即可 (不重新训练)
+                    tbl.optimize()
+                return False
+
+        logger.info(f"🏗️ 正在为 {rows} 行向量构建 {Config.VECTOR_INDEX_TYPE} 索引...")
+        build_vector_index(tbl)
+        logger.info("✅ 向量索引构建完成")
+        return True
+
+    def search(self, query, top_k=5, filters=None, nprobes=None, refine_factor=None):
+        """
+        语义搜索
+        :param filters: 元数据预过滤，例如 {"job_type": "Hourly", "budget_min": 30}
+        :param nprobes / refine_factor: 覆盖默认的 ANN 查询参数 (只在有索引时生效)
+        """
+        tbl = self._get_table()
+        if tbl is None:
             return []
 
         query_vector = self._get_embedding(query)
+        if query_vector is None:
+            return []
+
+        where = table_where(filters, tbl.schema.names)
 
-        tbl = self.db.open_table(self.table_name)
         # LanceDB 的搜索语法
-        results = tbl.search(query_vector).limit(top_k).to_pandas()
+        results = vector_query(tbl, query_vector, top_k, where, nprobes, refine_factor).to_pandas()
         return results.to_dict('records')
+
+    def keyword_search(self, query, top_k=5, filters=None):
+        """全文检索 (BM25)，精确匹配技能名这类关键词；没有全文索引时返回 []"""
+        tbl = self._get_table()
+        if tbl is None:
+            return []
+        where = table_where(filters, tbl.schema.names)
+        try:
+            return fts_query(tbl, query, top_k, where).to_list()
+        except Exception as e:
+            logger.warning(f"⚠️ 全文检索失败 (可能还没建全文索引，运行 sync_vectors 即可): {e}")
+            return []
+
+    def hybrid_search(self, query, top_k=5, filters=None, candidates=None):
+        """向量 + 全文 两路检索 (两个线程并行：向量那一路要等 embeddings 接口)，RRF 融合后取 top_k"""
+        candidates = max(top_k, candidates or Config.HYBRID_CANDIDATES)
+        # 先在当前线程打开表句柄，两路共用，避免并发的 _get_table 撞上重新检查的节流各返回一半
+        if self._get_table() is None:
+            return []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            vector_results = executor.submit(self.search, query, candidates, filters)
+            keyword_results = executor.submit(self.keyword_search, query, candidates, filters)
+            return reciprocal_rank_fusion(
+                [vector_results.result(), keyword_results.result()],
+                k=Config.HYBRID_RRF_K, top_k=top_k
+            )
+
+
+class AsyncVectorStore:
+    """
+    VectorStore 的异步只读版本 (API 检索路径用，基于 LanceDB 异步 API)
+    建表 / 写入 / 建索引仍然由同步的 VectorStore (sync_vectors) 负责
+    """
+
+    def __init__(self, embedder, db_path=None, limit=None):
+        # embedder 是 AsyncEmbedder
+        self.embedder = embedder
+        self.db_path = db_path or default_db_path()
+        self.table_name = "upwork_jobs"
+        self.limit = limit or UpstreamLimit(
+            "vector_search", Config.VECTOR_SEARCH_MAX_INFLIGHT, Config.VECTOR_SEARCH_TIMEOUT
+        )
+        self.db = None
+        self._table = None
+        self._table_checked_at = float("-inf")
+        # 混合检索两路并发时，保证只有一个协程去连接 / 打开表
+        self._open_lock = asyncio.Lock()
+
+    async def _get_table(self, recheck=False):
+        """常驻的表句柄 (和同步版一样靠 read_consistency_interval 自动跟上新版本)，表不存在返回 None"""
+        if self._table is not None:
+            return self._table
+        async with self._open_lock:
+            if self.db is None:
+                os.makedirs(self.db_path, exist_ok=True)
+                self.db = await lancedb.connect_async(
+                    self.db_path, read_consistency_interval=timedelta(seconds=Config.VECTOR_REFRESH_SECONDS)
+                )
+            if self._table is None:
+                now = time.monotonic()
+                if not recheck and now - self._table_checked_at < Config.VECTOR_REFRESH_SECONDS:
+                    return None
+                self._table_checked_at = now
+                if self.table_name in await self.db.table_names():
+                    self._table = await self.db.open_table(self.table_name)
+            return self._table
+
+    async def table_version(self):
+        tbl = await self._get_table()
+        return await tbl.version() if tbl is not None else None
+
+    async def warm_up(self):
+        """打开表，并把向量索引预加载进缓存，返回行数"""
+        tbl = await self._get_table(recheck=True)
+        if tbl is None:
+            return 0
+        for idx in await tbl.list_indices():
+            if "vector" in idx.columns:
+                await tbl.prewarm_index(idx.name)
+        return await tbl.count_rows()
+
+    async def search(self, query, top_k=5, filters=None, nprobes=None, refine_factor=None, query_vector=None):
+        """
+        同 VectorStore.search，返回 list[dict]
+        :param query_vector: 调用方已经算好的问题向量 (省一次 embedding)
+        """
+        tbl = await self._get_table()
+        if tbl is None:
+            return []
+
+        if query_vector is None:
+            query_vector = await self.embedder.embed(query)
+        if query_vector is None:
+            return []
+
+        where = table_where(filters, (await tbl.schema()).names)
+
+        query = async_vector_query(tbl, query_vector, top_k, where, nprobes, refine_factor)
+        return await self.limit.call(query.to_list)
+
+    async def keyword_search(self, query, top_k=5, filters=None):
+        """同 VectorStore.keyword_search"""
+        tbl = await self._get_table()
+        if tbl is None:
+            return []
+        where = table_where(filters, (await tbl.schema()).names)
+        try:
+            return await self.limit.call(async_fts_query(tbl, query, top_k, where).to_list)
+        except UpstreamTimeout:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ 全文检索失败 (可能还没建全文索引，运行 sync_vectors 即可): {e}")
+            return []
+
+    async def hybrid_search(self, query, top_k=5, filters=None, query_vector=None, candidates=None):
+        """向量检索和全文检索并行执行，RRF 融合后取 top_k"""
+        candidates = max(top_k, candidates or Config.HYBRID_CANDIDATES)
+        vector_results, keyword_results = await asyncio.gather(
+            self.search(query, candidates, filters, query_vector=query_vector),
+            self.keyword_search(query, candidates, filters),
+        )
+        return reciprocal_rank_fusion([vector_results, keyword_results], k=Config.HYBRID_RRF_K, top_k=top_k)
@@ -1,11 +1,17 @@
 #SQLAlchemy 的 引擎Engine和会话SessionLocal
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import NullPool, QueuePool
 import os
+import time
 from dotenv import load_dotenv
 from src.config import Config
+from src.core.logger import setup_logger
+from src.core.metrics import LatencyTracker
+
+logger = setup_logger("Database")
 # 1. 加载 .env 文件里的密码
 # 哪怕你现在没用 .env，也先写上，这是好习惯
 load_dotenv()
@@ -15,12 +21,111 @@ load_dotenv()
 # 如果你是 Mac Postgres.app，默认没有密码，用户通常是你的系统用户名
 
 # 3. 创建引擎 (Engine)
-# echo=True 会在控制台打印出生成的 SQL 语句，方便调试（生产环境要关掉）
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+# 所有进程都通过 get_engine(角色) 拿引擎，连接池参数见 Config.DB_PROFILES
+class InstrumentedQueuePool(QueuePool):
+    """
+    记录每次从连接池借连接要等多久 (池满时排队)，以及等超时的次数
+    连接池被占满时，接口变慢的原因就能在 pool_stats() 里直接看到
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = LatencyTracker("pool_checkout_wait")
+        self.checkout_timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            logger.warning(f"⚠️ 数据库连接池已满，等待 {time.perf_counter() - start:.1f}s 仍拿不到连接 ({self.status()})")
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        # dispose() 之后换新池，统计数据接着用
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+        pool.checkout_timeouts = self.checkout_timeouts
+        return pool
+
+
+def create_db_engine(role="api", **overrides):
+    """
+    按角色创建引擎 (一般用 get_engine，同一个进程同一个角色只建一次)
+    :param overrides: 覆盖 Config.DB_PROFILES 里的参数，例如 statement_timeout_ms=0
+    """
+    profile = dict(Config.DB_PROFILES[role], **overrides)
+    timeout_ms = profile["statement_timeout_ms"]
+    connect_args = {"application_name": f"uphunter-{role}"}  # pg_stat_activity 里能看出是哪类进程
+
+    if Config.DB_PGBOUNCER:
+        # transaction pooling 下同一个会话的前后两个事务可能在不同的服务端连接上：
+        # 连接复用交给 PgBouncer (客户端不再建池)，也不能用启动参数 / 会话级 SET
+        engine = create_engine(
+            Config.SQLALCHEMY_DATABASE_URI, poolclass=NullPool, connect_args=connect_args
+        )
+        if timeout_ms:
+            @event.listens_for(engine, "begin")
+            def set_statement_timeout(conn):
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+        return engine
+
+    if timeout_ms:
+        # 服务端语句超时：跑飞的查询到点由 Postgres 取消，不会一直占着连接
+        connect_args["options"] = f"-c statement_timeout={int(timeout_ms)}"
+    return create_engine(
+        Config.SQLALCHEMY_DATABASE_URI,
+        poolclass=InstrumentedQueuePool,
+        pool_size=profile["pool_size"],
+        max_overflow=profile["max_overflow"],
+        pool_timeout=profile["pool_timeout"],
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=True,  # 借出前先探活，数据库重启 / 连接被断开后自动重连
+        connect_args=connect_args,
+    )
+
+
+_engines = {}
+_sessionmakers = {}
+
+
+def get_engine(role="api"):
+    """同一个进程里同一个角色共用一个引擎 (和它的连接池)"""
+    if role not in _engines:
+        _engines[role] = create_db_engine(role)
+    return _engines[role]
+
+
+def get_sessionmaker(role="api"):
+    if role not in _sessionmakers:
+        _sessionmakers[role] = sessionmaker(autocommit=False, autoflush=False, bind=get_engine(role))
+    return _sessionmakers[role]
+
+
+def pool_stats():
+    """本进程里各个引擎的连接池状态 (借连接的等待时间分位数、等超时次数)"""
+    stats = []
+    for role, engine in _engines.items():
+        pool = engine.pool
+        item = {"role": role, "pgbouncer": Config.DB_PGBOUNCER}
+        if isinstance(pool, QueuePool):
+            item.update({"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()})
+        if isinstance(pool, InstrumentedQueuePool):
+            item["checkout_wait"] = pool.checkout_wait.snapshot()
+            item["checkout_timeouts"] = pool.checkout_timeouts
+        stats.append(item)
+    return stats
+
+
+engine = get_engine("api")
 
 # 4. 创建会话工厂 (SessionLocal)
-# 以后我们要操作数据库，就找 SessionLocal 要一个 session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 以后我们要操作数据库，就找 SessionLocal 要一个 session (接口进程用)；
+# 批处理任务用 get_sessionmaker("worker")
+SessionLocal = get_sessionmaker("api")
 
 # 5. 创建基类 (Base)
 # 以后所有的表模型都要继承这个 Base
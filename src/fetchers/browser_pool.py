@@ -0,0 +1,225 @@
+# 浏览器池：N 个 StealthBrowserFetcher 并发消费 (keyword, page) 任务
+import os
+import queue
+import random
+import shutil
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from src.config import Config
+from src.core.logger import setup_logger
+from src.fetchers.stealth_browser import StealthBrowserFetcher
+
+logger = setup_logger("BrowserPool")
+
+# 一个抓取任务 = 某个关键词的某一页
+CrawlTask = namedtuple("CrawlTask", ["keyword", "page", "url"])
+# 抓取结果 (html 为 None 表示重试后仍然失败；timings 是浏览器最近一次 fetch 的各阶段耗时)
+CrawlResult = namedtuple("CrawlResult", ["task", "html", "worker_id", "elapsed", "timings"])
+
+_STOP = object()  # 通知 worker 退出的哨兵
+
+
+class _BrowserWorker(threading.Thread):
+    """
+    单个 worker：独占一个浏览器 (独立 Profile + 独立 Xvfb 显示)，
+    从共享队列里取任务，抓完把结果放回结果队列。
+    """
+
+    def __init__(self, pool, worker_id):
+        super().__init__(name=f"BrowserWorker-{worker_id}", daemon=True)
+        self.pool = pool
+        self.worker_id = worker_id
+        self.profile_dir = os.path.abspath(os.path.join(pool.profile_root, f"worker_{worker_id}"))
+        self.display = None
+        self.xvfb = None
+        self.browser = None
+        self.pages_served = 0
+        self.next_fetch_at = 0.0
+
+    # --- 生命周期 ---
+    def _start_display(self):
+        if not self.pool.use_xvfb or self.xvfb:
+            return
+        if not shutil.which("Xvfb"):
+            logger.warning("⚠️ 未找到 Xvfb，worker 将直接使用当前显示")
+            return
+        display_num = self.pool.display_base + self.worker_id
+        self.display = f":{display_num}"
+        self.xvfb = subprocess.Popen(
+            ["Xvfb", self.display, "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        time.sleep(1)  # 等 X server 就绪
+        logger.info(f"🖥️ [W{self.worker_id}] Xvfb 已启动: {self.display}")
+
+    def _open_browser(self):
+        if self.browser:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.browser = StealthBrowserFetcher(
+            headless=self.pool.headless,
+            user_data_dir=self.profile_dir,
+            display=self.display
+        )
+        self.pages_served = 0
+
+    def _close_browser(self):
+        if self.browser:
+            self.browser.close()
+            self.browser = None
+
+    def shutdown(self):
+        self._close_browser()
+        if self.xvfb:
+            self.xvfb.terminate()
+            try:
+                self.xvfb.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.xvfb.kill()
+            self.xvfb = None
+
+    # --- 主循环 ---
+    def run(self):
+        try:
+            try:
+                self._start_display()
+            except Exception as e:
+                logger.error(f"❌ [W{self.worker_id}] Xvfb 启动失败，使用当前显示: {e}")
+            while True:
+                task = self.pool._tasks.get()
+                if task is _STOP:
+                    break
+                self.pool._results.put(self._handle(task))
+        finally:
+            self.shutdown()
+
+    def _pace(self):
+        """每个 worker 自己控制翻页节奏，模拟真人"""
+        wait = self.next_fetch_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def _handle(self, task):
+        start = time.monotonic()
+        html = None
+        timings = {}
+
+        for attempt in range(self.pool.max_attempts):
+            self._pace()
+            try:
+                self._open_browser()
+                html = self.browser.fetch(task.url, **self.pool.fetch_kwargs)
+                timings = dict(self.browser.last_timings)
+            except Exception as e:
+                logger.warning(f"⚠️ [W{self.worker_id}] 抓取异常 (尝试 {attempt + 1}/{self.pool.max_attempts}): {e}")
+            finally:
+                self.next_fetch_at = time.monotonic() + random.uniform(self.pool.min_delay, self.pool.max_delay)
+
+            if html:
+                break
+            # 失败多半是浏览器状态坏了，直接重启浏览器再试
+            self._close_browser()
+
+        if html:
+            self.pages_served += 1
+            if self.pages_served >= self.pool.recycle_after:
+                # 定期换新浏览器，防止长时间运行导致的指纹积累或内存泄漏
+                self._close_browser()
+
+        return CrawlResult(task, html, self.worker_id, time.monotonic() - start, timings)
+
+
+class BrowserPool:
+    """
+    受管的浏览器池
+
+    用法:
+        with BrowserPool(size=3) as pool:
+            for result in pool.imap(tasks):
+                ...
+
+    也可以边消费边追加任务 (例如根据上一页的结果决定要不要翻下一页):
+        pool.submit(task)
+        for result in pool.results():
+            if need_more:
+                pool.submit(next_task)
+
+    结果按完成顺序返回 (不保证和任务顺序一致)。
+    解析和入库留给调用方在主线程里做 (SQLAlchemy Session 不是线程安全的)。
+    """
+
+    def __init__(self, size=None, headless=False, min_delay=None, max_delay=None,
+                 recycle_after=None, use_xvfb=None, max_attempts=3,
+                 profile_root=os.path.join("data", "chrome_profiles"), display_base=100,
+                 fetch_kwargs=None):
+        self.size = max(1, size or Config.CRAWL_WORKERS)
+        self.headless = headless
+        self.min_delay = Config.CRAWL_PAGE_DELAY_MIN if min_delay is None else min_delay
+        self.max_delay = Config.CRAWL_PAGE_DELAY_MAX if max_delay is None else max_delay
+        self.recycle_after = recycle_after or Config.CRAWL_RECYCLE_PAGES
+        self.use_xvfb = Config.CRAWL_USE_XVFB if use_xvfb is None else use_xvfb
+        self.max_attempts = max_attempts
+        self.profile_root = profile_root
+        self.display_base = display_base
+        self.fetch_kwargs = fetch_kwargs or {}
+
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._workers = []
+        self._pending = 0  # 已提交但还没取走结果的任务数 (只在调用方线程里读写)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        if self._workers:
+            return
+        logger.info(f"🚀 启动浏览器池: {self.size} 个 worker")
+        for i in range(self.size):
+            worker = _BrowserWorker(self, i)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, task):
+        """提交一个任务 (可以在 results() 迭代过程中继续提交)"""
+        self.start()
+        self._pending += 1
+        self._tasks.put(task)
+
+    def results(self):
+        """按完成顺序逐个产出 CrawlResult，直到所有已提交的任务都完成"""
+        while self._pending:
+            result = self._results.get()
+            self._pending -= 1
+            yield result
+
+    def imap(self, tasks):
+        """提交一批任务，按完成顺序逐个产出 CrawlResult"""
+        for task in tasks:
+            self.submit(task)
+        yield from self.results()
+
+    def close(self):
+        """通知所有 worker 退出并回收浏览器 / Xvfb"""
+        if not self._workers:
+            return
+        # 丢弃还没开始的任务 (例如调用方中途退出)
+        while True:
+            try:
+                self._tasks.get_nowait()
+            except queue.Empty:
+                break
+        self._pending = 0
+        for _ in self._workers:
+            self._tasks.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        logger.info("🛑 浏览器池已关闭")
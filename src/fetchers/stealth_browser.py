@@ -3,14 +3,28 @@ import time
 import logging
 import os
 import pickle
+import random
+import re
+import subprocess
+import threading
+from contextlib import contextmanager
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from src.config import Config
 from src.fetchers.base import BaseFetcher
 
 logger = logging.getLogger("StealthBrowser")
 
+# uc 启动时会改写 chromedriver 二进制，并且 Chrome 从环境变量继承 DISPLAY
+# 多个浏览器并发启动时必须串行化，否则会互相踩踏
+_LAUNCH_LOCK = threading.Lock()
+
+POLL_INTERVAL = 0.25  # 轮询页面状态的间隔 (秒)
+BLOCKED_TITLES = ("Just a moment", "Access denied")
+DEFAULT_TILE_SELECTOR = "article, [data-test='JobTile']"
+
 
 class StealthBrowserFetcher(BaseFetcher):
     """
@@ -18,15 +32,26 @@ class StealthBrowserFetcher(BaseFetcher):
     专门用于对抗 Realestate.com.au 这种高防网站
     """
 
-    def __init__(self, headless=False, timeout=30):
+    def __init__(self, headless=False, timeout=30, user_data_dir=None, display=None,
+                 jitter_budget=None, settle_time=None):
         """
         :param headless: 默认为 False。
         注意：uc 的无头模式在某些系统上容易被识别，
         为了稳定性，建议在服务器上使用 XVFB 虚拟显示，而在本地开发时开启窗口。
+        :param user_data_dir: 独立的 Chrome Profile 目录 (浏览器池里每个 worker 一个)
+        :param display: X11 显示编号，例如 ":101" (配合 Xvfb 使用)
+        :param jitter_budget: 每个页面最多花多少秒做"人类停顿" (随机小延迟)
+        :param settle_time: 卡片数量保持不变多久才算加载完成 (秒)
         """
         self.headless = headless
         self.timeout = timeout
+        self.user_data_dir = user_data_dir
+        self.display = display
+        self.jitter_budget = Config.CRAWL_JITTER_BUDGET if jitter_budget is None else jitter_budget
+        self.settle_time = Config.CRAWL_SETTLE_TIME if settle_time is None else settle_time
         self.driver = None
+        self.last_timings = {}  # 最近一次 fetch 各阶段耗时
+        self._jitter_left = 0.0
 
     def _init_driver(self):
         if self.driver:
@@ -51,57 +76,82 @@ class StealthBrowserFetcher(BaseFetcher):
             # 4. 启动 UC Driver
             # version_main=None 表示自动检测本地 Chrome 版本
             # use_subprocess=True 可以防止进程卡死
-            self.driver = uc.Chrome(
-                options=options,
-                headless=self.headless,
-                use_subprocess=True,
-                version_main=None
-            )
+            with _LAUNCH_LOCK:
+                old_display = os.environ.get("DISPLAY")
+                if self.display:
+                    os.environ["DISPLAY"] = self.display
+                try:
+                    self.driver = uc.Chrome(
+                        options=options,
+                        headless=self.headless,
+                        use_subprocess=True,
+                        version_main=None,
+                        user_data_dir=self.user_data_dir
+                    )
+                finally:
+                    if self.display:
+                        if old_display is None:
+                            os.environ.pop("DISPLAY", None)
+                        else:
+                            os.environ["DISPLAY"] = old_display
 
             logger.info("✅ 隐形浏览器启动成功")
 
         except Exception as e:
             logger.critical(f"❌ 浏览器启动惨败: {e}")
             # 如果启动失败，尝试清理残留进程 (Linux/Mac)
+            # 有独立 Profile 时只清理自己的进程，别误杀池里其他 worker 的浏览器
             try:
-                os.system("pkill -f chrome")
-            except:
+                if self.user_data_dir:
+                    subprocess.run(["pkill", "-f", re.escape(self.user_data_dir)], check=False)
+                else:
+                    subprocess.run(["pkill", "-f", "chrome"], check=False)
+            except Exception:
                 pass
             raise e
 
-    def fetch(self, url, wait_for_selector=None, sleep_time=5):
+    def fetch(self, url, wait_for_selector=None, sleep_time=5, tile_selector=DEFAULT_TILE_SELECTOR):
         """
-        :param sleep_time: 强制等待时间。对于高防网站，不仅要等元素，还要等 Cloudflare 验证跳过。
+        :param sleep_time: Cloudflare 验证的最长等待时间。不再硬等，验证一通过立即继续。
+        :param tile_selector: 列表卡片的选择器，用来判断页面是否加载完 / 滚动是否还有新内容
         """
         self._init_driver()
+        self.last_timings = {}
+        self._jitter_left = self.jitter_budget
+        started = time.monotonic()
 
         try:
             logger.info(f"🕵️‍♂️ 潜入: {url}")
-            self.driver.get(url)
+            with self._phase("navigate"):
+                self.driver.get(url)
 
             # 1. 刚进入页面，大概率会遇到 Cloudflare 验证
-            # 策略：硬等。UC driver 通常能自动通过验证，但需要时间。
-            logger.info(f"⏳ 等待 Cloudflare/页面加载 ({sleep_time}s)...")
-            time.sleep(sleep_time)
-
-            # 2. 检查是否被拦截 (Title 包含 'Just a moment' 通常是被拦了)
-            if "Just a moment" in self.driver.title or "Access denied" in self.driver.title:
-                logger.error("⛔️ 被 Cloudflare 拦截！")
-                # 这里可以接入打码平台 (Level 5 内容)，现在先抛错
-                # 或者尝试刷新
-                self.driver.refresh()
-                time.sleep(sleep_time + 5)
-
-            # 3. 智能等待目标元素
+            # 策略：轮询标题，UC driver 自动通过验证后立刻继续
+            with self._phase("cloudflare"):
+                if not self._wait_for_challenge(sleep_time):
+                    logger.error("⛔️ 被 Cloudflare 拦截！尝试刷新...")
+                    # 这里可以接入打码平台 (Level 5 内容)，现在先刷新再等一轮
+                    self.driver.refresh()
+                    if not self._wait_for_challenge(sleep_time + 5):
+                        logger.error("⛔️ 刷新后仍被拦截")
+
+            # 2. 智能等待目标元素
             if wait_for_selector:
                 logger.info(f"👁️ 寻找目标: {wait_for_selector}")
-                WebDriverWait(self.driver, self.timeout).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, wait_for_selector))
-                )
+                with self._phase("selector"):
+                    WebDriverWait(self.driver, self.timeout, poll_frequency=POLL_INTERVAL).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, wait_for_selector))
+                    )
+
+            # 3. 等卡片数量稳定 (前端还在渲染时数量会持续变化)
+            if tile_selector:
+                with self._phase("settle"):
+                    self._wait_for_stable_count(tile_selector)
 
             # 4. 模拟人类滚动 (Scroll)
-            # 很多网站的数据是懒加载的，不滚到底部不出来
-            self._human_scroll()
+            # 很多网站的数据是懒加载的，没有新卡片出现就停止滚动
+            with self._phase("scroll"):
+                self._human_scroll(tile_selector)
 
             return self.driver.page_source
 
@@ -115,14 +165,90 @@ class StealthBrowserFetcher(BaseFetcher):
                 pass
             return None
 
-    def _human_scroll(self):
-        """模拟人类不匀速滚动"""
-        import random
+        finally:
+            self.last_timings["jitter"] = self.jitter_budget - self._jitter_left
+            self.last_timings["total"] = time.monotonic() - started
+            logger.info("⏱️ 阶段耗时: " + ", ".join(f"{k}={v:.2f}s" for k, v in self.last_timings.items()))
+
+    # ==========================================
+    # 自适应等待 (代替固定 sleep)
+    # ==========================================
+    @contextmanager
+    def _phase(self, name):
+        """记录某个阶段的耗时到 last_timings"""
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.last_timings[name] = self.last_timings.get(name, 0.0) + time.monotonic() - t0
+
+    def _jitter(self, low=0.05, high=0.3):
+        """人类停顿：随机小延迟，但整页的总停顿不超过 jitter_budget"""
+        if self._jitter_left <= 0:
+            return
+        delay = min(random.uniform(low, high), self._jitter_left)
+        self._jitter_left -= delay
+        time.sleep(delay)
+
+    def _is_blocked(self):
+        title = self.driver.title or ""
+        return any(t in title for t in BLOCKED_TITLES)
+
+    def _wait_for_challenge(self, max_wait):
+        """轮询直到 Cloudflare 验证页消失，返回是否通过"""
+        deadline = time.monotonic() + max_wait
+        while self._is_blocked():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    def _count(self, selector):
+        return self.driver.execute_script(
+            "return document.querySelectorAll(arguments[0]).length;", selector
+        )
+
+    def _wait_for_stable_count(self, selector, timeout=None):
+        """等待匹配的元素数量在 settle_time 内不再变化，返回最终数量"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        last = self._count(selector)
+        stable_since = time.monotonic()
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            current = self._count(selector)
+            if current != last:
+                last = current
+                stable_since = time.monotonic()
+            elif time.monotonic() - stable_since >= self.settle_time:
+                break
+        return last
+
+    def _human_scroll(self, tile_selector=None, max_steps=50):
+        """
+        模拟人类不匀速滚动
+        有 tile_selector 时：滚到底后如果没有新卡片出现就停止；
+        否则退化为滚到页面底部为止。
+        """
         logger.info("👇 模拟滚动页面...")
-        total_height = self.driver.execute_script("return document.body.scrollHeight")
-        for i in range(1, total_height, random.randint(300, 700)):
-            self.driver.execute_script(f"window.scrollTo(0, {i});")
-            time.sleep(random.uniform(0.1, 0.5))
+        position = 0
+        tiles = self._count(tile_selector) if tile_selector else 0
+
+        for _ in range(max_steps):
+            position += random.randint(300, 700)
+            self.driver.execute_script(f"window.scrollTo(0, {position});")
+            self._jitter()
+
+            height = self.driver.execute_script("return document.body.scrollHeight")
+            if position < height:
+                continue
+
+            # 已到底部：看看懒加载有没有带来新卡片 / 新高度
+            if not tile_selector:
+                break
+            new_tiles = self._wait_for_stable_count(tile_selector, timeout=self.settle_time * 4)
+            if new_tiles <= tiles and self.driver.execute_script("return document.body.scrollHeight") <= height:
+                break
+            tiles = new_tiles
 
     def save_cookies(self, filename="twitter_cookies.pkl"):
         """保存当前登录状态"""
@@ -1,52 +1,101 @@
-from src.database import SessionLocal
-from src.models import UpworkJob
-from src.core.ai_client import AIClient
-from src.core.logger import setup_logger
+import argparse
+import os
+import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
+from src.config import Config
+from src.database import get_sessionmaker
+from src.core.ai_client import AIClient, SKILLS_PROMPT_VERSION, pack_skill_batches
+from src.core.logger import setup_logger
+from src.core.rate_limit import RateLimiter
+from src.storage.postgres import PostgresStorage
 
 logger = setup_logger("Job.AI_Analysis")
 
 
-def run():
-    db = SessionLocal()
-    ai = AIClient()
-
+def analyze_pack(ai, pack):
+    """
+    一包职位一个请求，返回 [(url, skills, error)]
+    接口 / 网络异常返回 None：这一包不写结果也不计失败次数，租约过期后重新领取
+    """
     try:
-        # 1. 找出还没被 AI 分析过的职位
-        # 假设如果 skills 为空，或者 skills 是我们简单清洗的，就需要 AI 再跑一遍
-        # 这里我们简单点：只取前 5 条没分析过的试试水
-        jobs = db.query(UpworkJob).limit(5).all()
+        extracted = ai.extract_skills_pack(pack)
+    except Exception as e:
+        logger.warning(f"⚠️ AI 接口调用失败，跳过这一包 ({len(pack)} 个职位): {e}")
+        return None
+    return [
+        (url, extracted[url], None) if url in extracted else (url, None, "技能提取失败")
+        for url, _ in pack
+    ]
 
-        logger.info(f"🤖 开始 AI 深度分析，共 {len(jobs)} 个任务...")
 
-        for job in jobs:
-            if not job.description:
-                continue
+def run(batch_size=None, concurrency=None, limit=None):
+    """
+    分析积压的职位 (提取技能)
+    1. 每批领取 batch_size 个还没分析过的职位：写一个租约 (claimed_at / claimed_by) 立即提交，
+       调用 AI 期间不持有行锁和事务 (可以同时跑多个进程，不会领到同一批)
+    2. 这一批按 token 预算打包 (一个请求带多个职位)，各包在线程池里并发调用 AI，整体受 RPM/TPM 令牌桶限流
+    3. 写回结果和分析状态 (模型 / Prompt 版本 / 时间)，释放租约，立即提交
+    中途崩溃最多丢掉当前这一批，租约过期 (ANALYZE_LEASE_SECONDS) 后会被重新领取。
+    :param limit: 最多处理多少个职位 (None = 直到没有积压)
+    """
+    batch_size = batch_size or Config.ANALYZE_BATCH_SIZE
+    concurrency = concurrency or Config.ANALYZE_CONCURRENCY
 
-            logger.info(f"🧠 分析职位: {job.title[:30]}...")
+    limiter = RateLimiter(rpm=Config.AI_RPM_LIMIT, tpm=Config.AI_TPM_LIMIT)
+    ai = AIClient(rate_limiter=limiter)
+    if not ai.client:
+        return
 
-            # 调用 AI
-            extracted_skills = ai.extract_skills(job.description)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    db = get_sessionmaker("worker")()
+    storage = PostgresStorage(db)
+    processed = succeeded = 0
+    start = time.time()
+    logger.info(f"🤖 开始 AI 分析积压职位 (每批 {batch_size} 个, 并发 {concurrency}, "
+                f"RPM {Config.AI_RPM_LIMIT}, TPM {Config.AI_TPM_LIMIT})")
 
-            if extracted_skills and "Error" not in extracted_skills:
-                # 更新数据库
-                # 我们可以把 AI 的结果追加到原有的 skills 后面，或者覆盖
-                # 这里演示覆盖，为了看效果
-                job.skills = extracted_skills
-                logger.info(f"   ✅ 提取技能: {extracted_skills}")
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while limit is None or processed < limit:
+                n = batch_size if limit is None else min(batch_size, limit - processed)
+                jobs = storage.claim_unanalyzed_jobs(
+                    ai.chat_model, SKILLS_PROMPT_VERSION, n, Config.ANALYZE_MAX_ATTEMPTS,
+                    worker=worker, lease_seconds=Config.ANALYZE_LEASE_SECONDS,
+                )
+                if not jobs:
+                    break
+
+                packs = pack_skill_batches(jobs)
+                pack_results = list(executor.map(lambda pack: analyze_pack(ai, pack), packs))
+                results = [r for rs in pack_results if rs is not None for r in rs]
+                storage.save_analyses(results, ai.chat_model, SKILLS_PROMPT_VERSION)
+                storage.commit()
 
-            # 休息一下，别把 API 刷爆了
-            time.sleep(1)
+                if all(rs is None for rs in pack_results):
+                    # 整批都是接口异常 (服务不可用 / 额度用完)，继续领取只会把积压全部空转一遍
+                    logger.error("❌ 本批所有 AI 请求都失败，停止分析")
+                    break
 
-        db.commit()
-        logger.info("💾 分析结果已保存")
+                processed += len(results)
+                succeeded += sum(1 for _, _, error in results if error is None)
+                elapsed = time.time() - start
+                logger.info(f"💾 已处理 {processed} 个 (成功 {succeeded}, 本批 {len(packs)} 个请求), "
+                            f"{processed / elapsed * 60:.0f} 个/分钟")
 
     except Exception as e:
-        db.rollback()
+        storage.rollback()
         logger.error(f"❌ 分析失败: {e}")
     finally:
         db.close()
 
+    logger.info(f"🏁 分析结束: 共处理 {processed} 个职位, 成功 {succeeded}, 耗时 {time.time() - start:.0f}s")
+
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="AI 分析积压的职位 (提取技能)")
+    parser.add_argument("--batch-size", type=int, default=None, help="每批领取并提交的职位数")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时在途的 AI 请求数")
+    parser.add_argument("--limit", type=int, default=None, help="最多处理多少个职位")
+    args = parser.parse_args()
+    run(batch_size=args.batch_size, concurrency=args.concurrency, limit=args.limit)
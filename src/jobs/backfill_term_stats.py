@@ -0,0 +1,65 @@
+import argparse
+import time
+from src.database import get_sessionmaker
+from src.core.logger import setup_logger
+from src.storage.postgres import PostgresStorage
+
+logger = setup_logger("Job.BackfillTermStats")
+
+
+def run(chunk_size=2000):
+    """
+    给上线词频统计之前入库的老职位补算 term_stats
+    每块锁定 chunk_size 个 terms_counted 不为 True 的职位，统计、标记、提交；
+    新入库的职位在入库时已经计数并标记，不会重复统计。中途中断重跑即可从断点继续。
+    """
+    db = get_sessionmaker("worker")()
+    storage = PostgresStorage(db)
+    processed = 0
+    start = time.time()
+    try:
+        while True:
+            rows = storage.claim_jobs_without_terms(chunk_size)
+            if not rows:
+                break
+            storage.update_term_stats([
+                {"search_keyword": keyword, "description": description} for _, keyword, description in rows
+            ])
+            storage.mark_terms_counted([url for url, _, _ in rows])
+            storage.commit()
+            processed += len(rows)
+            logger.info(f"💾 已回填 {processed} 个职位 ({processed / (time.time() - start):.0f} 个/秒)")
+    except Exception as e:
+        storage.rollback()
+        logger.error(f"❌ 回填失败: {e}")
+        raise
+    finally:
+        db.close()
+    logger.info(f"✅ 词频回填完成: 共 {processed} 个职位, 耗时 {time.time() - start:.1f}s")
+
+
+def rebuild_rollup():
+    """从各关键词的词频重算全局合计行 (上线合计行之前已经统计过的数据跑一次即可)"""
+    db = get_sessionmaker("worker")()
+    storage = PostgresStorage(db)
+    try:
+        terms = storage.rebuild_term_rollup()
+        storage.commit()
+        logger.info(f"✅ 全局词频合计已重算: {terms} 个词")
+    except Exception as e:
+        storage.rollback()
+        logger.error(f"❌ 重算失败: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="回填老职位的词频统计 (term_stats)")
+    ap.add_argument("--chunk-size", type=int, default=2000, help="每块处理并提交的职位数")
+    ap.add_argument("--rollup", action="store_true", help="只重算全局合计行 (search_keyword = '*')")
+    args = ap.parse_args()
+    if args.rollup:
+        rebuild_rollup()
+    else:
+        run(chunk_size=args.chunk_size)
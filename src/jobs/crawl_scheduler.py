@@ -0,0 +1,110 @@
+import argparse
+import time
+from datetime import timedelta
+from sqlalchemy import func, select
+from src.config import Config
+from src.database import get_sessionmaker
+from src.core.crawl_schedule import budget_scale
+from src.core.logger import setup_logger
+from src.models import CrawlWatermark
+from src.storage.postgres import PostgresStorage
+
+logger = setup_logger("Job.CrawlScheduler")
+
+MAX_PAGES = 5  # 同 scrape_upwork.MAX_PAGES (不导入爬虫模块，调度器不依赖 Chrome)
+
+
+def tick(storage):
+    """
+    一轮调度：把到期的关键词放进抓取队列 (crawl_jobs)，由 crawl_worker 执行
+    下次入队时间 = 现在 + 间隔 x 全局预算系数 (所有关键词每小时的页数超出 CRAWL_PAGE_BUDGET_PER_HOUR 时整体拉长)
+    :return: 本轮入队的关键词
+    """
+    scale = budget_scale(storage.list_crawl_keywords())
+    due = storage.due_crawl_keywords()
+    now = storage.db.execute(select(func.now())).scalar()
+    for kw in due:
+        storage.enqueue_crawl(kw.search_keyword, MAX_PAGES)
+        kw.next_run_at = now + timedelta(seconds=kw.interval_seconds * scale)
+    storage.commit()
+    if due:
+        logger.info(f"📅 入队 {len(due)} 个关键词 (预算系数 x{scale:.2f}): "
+                    + ", ".join(kw.search_keyword for kw in due))
+    return [kw.search_keyword for kw in due]
+
+
+def seed(storage):
+    """crawl_keywords 为空时，用抓过的关键词 (crawl_watermarks) 初始化"""
+    if storage.list_crawl_keywords(enabled_only=False):
+        return
+    keywords = [kw for (kw,) in storage.db.query(CrawlWatermark.search_keyword)]
+    if keywords:
+        storage.add_crawl_keywords(keywords)
+        storage.commit()
+        logger.info(f"🌱 从抓取水位线导入 {len(keywords)} 个关键词")
+
+
+def run():
+    """常驻调度：每 CRAWL_SCHEDULER_TICK 秒检查一次到期的关键词"""
+    db = get_sessionmaker("worker")()
+    storage = PostgresStorage(db)
+    logger.info(f"⏰ 抓取调度器启动 (间隔 {Config.CRAWL_MIN_INTERVAL}s ~ {Config.CRAWL_MAX_INTERVAL}s, "
+                f"预算 {Config.CRAWL_PAGE_BUDGET_PER_HOUR:.0f} 页/小时)")
+    try:
+        seed(storage)
+        while True:
+            try:
+                tick(storage)
+            except Exception as e:
+                storage.rollback()
+                logger.error(f"❌ 调度出错: {e}")
+            time.sleep(Config.CRAWL_SCHEDULER_TICK)
+    except KeyboardInterrupt:
+        logger.info("👋 调度器退出")
+    finally:
+        db.close()
+
+
+def show(storage):
+    keywords = storage.list_crawl_keywords(enabled_only=False)
+    scale = budget_scale([kw for kw in keywords if kw.enabled])
+    print(f"{'keyword':<28} {'on':<3} {'new/h':>7} {'pages':>6} {'interval':>9} {'crawls':>7}  next_run_at")
+    for kw in keywords:
+        rate = f"{kw.rate_ewma:.1f}" if kw.rate_ewma is not None else "-"
+        pages = f"{kw.pages_ewma:.1f}" if kw.pages_ewma is not None else "-"
+        print(f"{kw.search_keyword:<28} {'y' if kw.enabled else 'n':<3} {rate:>7} {pages:>6} "
+              f"{kw.interval_seconds * scale / 60:>8.0f}m {kw.crawls:>7}  {kw.next_run_at or '-'}")
+    print(f"全局预算系数: x{scale:.2f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="自适应定时抓取调度器")
+    sub = ap.add_subparsers(dest="command")
+    sub.add_parser("run", help="常驻运行 (默认)")
+    sub.add_parser("list", help="查看关键词、产出和当前间隔")
+    add = sub.add_parser("add", help="添加 / 重新启用关键词")
+    add.add_argument("keywords", nargs="+")
+    add.add_argument("--interval", type=int, default=None, help="初始间隔 (秒)")
+    remove = sub.add_parser("remove", help="停用关键词 (保留历史统计)")
+    remove.add_argument("keywords", nargs="+")
+    args = ap.parse_args()
+
+    if args.command in (None, "run"):
+        run()
+    else:
+        db = get_sessionmaker("worker")()
+        storage = PostgresStorage(db)
+        try:
+            if args.command == "list":
+                show(storage)
+            elif args.command == "add":
+                storage.add_crawl_keywords(args.keywords, args.interval)
+                storage.commit()
+                print(f"✅ 已添加: {', '.join(args.keywords)}")
+            elif args.command == "remove":
+                for kw in args.keywords:
+                    storage.disable_crawl_keyword(kw)
+                storage.commit()
+                print(f"✅ 已停用: {', '.join(args.keywords)}")
+        finally:
+            db.close()
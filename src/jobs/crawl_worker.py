@@ -0,0 +1,83 @@
+import argparse
+import os
+import socket
+import time
+from src.config import Config
+from src.database import get_sessionmaker
+from src.core.logger import setup_logger
+from src.storage.postgres import PostgresStorage
+
+logger = setup_logger("Job.CrawlWorker")
+
+
+def process(storage, job, slot):
+    """跑一个抓取任务：只抓这个关键词 (增量)，每抓完一页回写进度"""
+    job_id, keyword, max_pages = job
+    logger.info(f"🕷️ 开始任务 #{job_id}: {keyword} (最多 {max_pages} 页)")
+
+    # 延迟导入，没装 Chrome 的环境也能导入这个模块
+    from src.jobs import scrape_upwork
+
+    result = scrape_upwork.run(
+        keywords=[keyword],
+        max_pages=max_pages,
+        on_progress=lambda kw, pages, new: storage.update_crawl_progress(job_id, pages, new),
+        # 单个关键词的增量抓取是逐页串行的，一个浏览器就够；
+        # 同一台机器上的多个 worker 用各自的 Profile 目录和 Xvfb 显示号，互不冲突
+        pool_kwargs={
+            "size": 1,
+            "profile_root": os.path.join("data", "chrome_profiles", f"slot_{slot}"),
+            "display_base": 100 + slot * 10,
+        },
+    )
+    storage.update_crawl_progress(job_id, result["pages"].get(keyword, 0), result["new_jobs"].get(keyword, 0))
+    storage.finish_crawl_job(job_id, error=result["error"])
+    status = "失败" if result["error"] else "完成"
+    logger.info(f"🏁 任务 #{job_id} {status}: {keyword} 新增 {result['new_jobs'].get(keyword, 0)} 条")
+
+
+def run(slot=0, once=False):
+    """
+    抓取 worker：不断从 crawl_jobs 队列领取任务执行
+    需要更多抓取能力就多开几个 worker (每台机器上的 --slot 不要重复)
+    :param once: 队列空了就退出 (给 cron / 调试用)
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    db = get_sessionmaker("worker")()
+    storage = PostgresStorage(db)
+    logger.info(f"👷 抓取 worker 启动: {worker} (slot {slot})")
+
+    try:
+        while True:
+            requeued, failed = storage.requeue_stale_crawl_jobs(
+                Config.CRAWL_JOB_STALE_SECONDS, Config.CRAWL_JOB_MAX_ATTEMPTS
+            )
+            if requeued or failed:
+                logger.warning(f"⚠️ 发现失联任务: 重新入队 {requeued} 个, 标记失败 {failed} 个")
+
+            job = storage.claim_crawl_job(worker)
+            if job is None:
+                if once:
+                    break
+                time.sleep(Config.CRAWL_WORKER_POLL_SECONDS)
+                continue
+
+            try:
+                process(storage, job, slot)
+            except Exception as e:
+                storage.rollback()
+                logger.error(f"❌ 任务 #{job[0]} 出错: {e}")
+                storage.finish_crawl_job(job[0], error=str(e))
+    except KeyboardInterrupt:
+        # 正在跑的任务停在 running，心跳超时后会被其他 worker 重新领取
+        logger.info("👋 worker 退出")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="抓取任务 worker (消费 POST /crawl 提交的任务)")
+    ap.add_argument("--slot", type=int, default=0, help="同一台机器上第几个 worker (决定浏览器 Profile 目录和显示号)")
+    ap.add_argument("--once", action="store_true", help="队列空了就退出")
+    args = ap.parse_args()
+    run(slot=args.slot, once=args.once)
@@ -0,0 +1,30 @@
+import time
+from src.database import get_sessionmaker
+from src.core.logger import setup_logger
+from src.storage.postgres import PostgresStorage
+
+logger = setup_logger("Job.RebuildStats")
+
+
+def run():
+    """
+    从 upwork_jobs 全量重算 job_stats 聚合表
+    平时 job_stats 随入库增量更新，不需要跑；首次上线 (已有历史数据) 或手动删改过职位后执行一次
+    """
+    db = get_sessionmaker("worker")()
+    storage = PostgresStorage(db)
+    start = time.time()
+    try:
+        groups = storage.rebuild_job_stats()
+        storage.commit()
+        logger.info(f"✅ job_stats 重算完成: {groups} 个 (关键词, 类型) 分组, 耗时 {time.time() - start:.1f}s")
+    except Exception as e:
+        storage.rollback()
+        logger.error(f"❌ 重算失败: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -1,121 +1,167 @@
+import argparse
 import time
 import urllib.parse
-import pandas as pd
-from src.fetchers.stealth_browser import StealthBrowserFetcher
+from collections import Counter
+from src.fetchers.browser_pool import BrowserPool, CrawlTask
 from src.parsers.upwork import UpworkParser
 from src.storage.postgres import PostgresStorage
-from src.database import SessionLocal
+from src.database import get_sessionmaker
 from src.core.logger import setup_logger
-from src.models import UpworkJob
 
 logger = setup_logger("Job.UpHunter")
 
-
-def run():
-    logger.info("🏹 启动 UpHunter 任务 (批量稳健版)...")
-
-    keywords = [
-        "Data Engineering",
-        "Streamlit",
-        "Tableau",
-        "Real Estate Data",
-        "Web Scraping"
-    ]
-
-    MAX_PAGES = 5
-
-    db = SessionLocal()
+DEFAULT_KEYWORDS = [
+    "Data Engineering",
+    "Streamlit",
+    "Tableau",
+    "Real Estate Data",
+    "Web Scraping"
+]
+
+MAX_PAGES = 5
+
+
+def build_task(keyword, page):
+    encoded_kw = urllib.parse.quote(keyword)
+    url = f"https://www.upwork.com/nx/search/jobs/?q={encoded_kw}&sort=recency&page={page}"
+    return CrawlTask(keyword, page, url)
+
+
+def run(keywords=None, max_pages=MAX_PAGES, incremental=True, on_progress=None, pool_kwargs=None):
+    """
+    :param incremental: True = 增量模式。搜索结果按 recency 排序，
+        一旦某页全是库里已有的职位 (或者碰到上次的水位线)，这个关键词就不再往后翻。
+        False = 全量模式，每个关键词都抓满 max_pages 页。
+    :param on_progress: 每处理完一页回调 on_progress(keyword, 已抓页数, 已新增职位数)
+    :param pool_kwargs: 透传给 BrowserPool (例如 crawl_worker 指定独立的 Profile 目录)
+    :return: {"pages": {关键词: 页数}, "failed_pages": {关键词: 抓取失败的页数},
+              "new_jobs": {关键词: 新增数}, "error": 崩溃原因或 None}
+    """
+    mode = "增量" if incremental else "全量"
+    logger.info(f"🏹 启动 UpHunter 任务 (并发浏览器池版, {mode}模式)...")
+
+    db = get_sessionmaker("worker")()
     storage = PostgresStorage(db)
     parser = UpworkParser()
 
-    try:
-        for kw in keywords:
-            logger.info(f"\n🔍 === 开始搜索任务: {kw} ===")
-
-            # 🟢 策略调整：每个关键词启动一个新的浏览器实例
-            # 防止长时间运行导致的指纹积累或内存泄漏
-            browser = StealthBrowserFetcher(headless=False)
-
-            try:
-                for page in range(1, MAX_PAGES + 1):
-                    logger.info(f"   📄 正在抓取第 {page} 页...")
-
-                    encoded_kw = urllib.parse.quote(kw)
-                    url = f"https://www.upwork.com/nx/search/jobs/?q={encoded_kw}&sort=recency&page={page}"
-
-                    # --- 重试循环 ---
-                    html = None
-                    for attempt in range(3):
-                        try:
-                            html = browser.fetch(url, wait_for_selector="article", sleep_time=10)
-                            if html: break
-                        except Exception as e:
-                            logger.warning(f"      ⚠️ 抓取异常 (尝试 {attempt + 1}/3): {e}")
-                            # 如果浏览器崩了，这里其实应该重启浏览器，简便起见先只做延时
-                            time.sleep(5)
-
-                    if html:
-                        df = parser.parse(html)
-
-                        if not df.empty:
-                            logger.info(f"      ✅ 成功解析 {len(df)} 个职位")
-
-                            # 数据补全
-                            if 'skills' not in df.columns:
-                                df['skills'] = ""
-                            df['search_keyword'] = kw
-                            df['skills'] = df['skills'].apply(lambda x: ', '.join(x) if isinstance(x, list) else str(x))
-
-                            # 入库
-                            count = 0
-                            for _, row in df.iterrows():
-                                if not row['url']: continue
-                                exists = storage.get(UpworkJob, row['url'])
-                                if not exists:
-                                    job = UpworkJob(
-                                        url=row['url'],
-                                        title=row['title'],
-                                        job_type=row['job_type'],
-                                        budget_min=row['budget_min'],
-                                        budget_max=row['budget_max'],
-                                        posted_time=row['posted_time'],
-                                        search_keyword=row['search_keyword'],
-                                        description=row['description'],
-                                        skills=row['skills']
-                                    )
-                                    storage.add(job)
-                                    count += 1
-
-                            storage.commit()
-                            logger.info(f"      💾 新增入库: {count} 条")
+    # 没指定关键词时用 crawl_keywords 表里启用的 (crawl_scheduler 维护)，表是空的再用内置列表
+    keywords = keywords or [kw.search_keyword for kw in storage.list_crawl_keywords()] or DEFAULT_KEYWORDS
+
+    pool = BrowserPool(
+        headless=False,
+        fetch_kwargs={"wait_for_selector": "article", "sleep_time": 10},
+        **(pool_kwargs or {})
+    )
+    started = time.monotonic()
+    phase_totals = Counter()  # 各阶段累计耗时 (navigate / cloudflare / settle / scroll ...)
+    pages_fetched = Counter()  # 每个关键词实际加载了几页
+    failed_pages = Counter()  # 其中抓取彻底失败 (没拿到 HTML) 的页数
+    new_jobs = Counter()  # 每个关键词新增了多少职位
+    error = None
 
+    try:
+        watermarks = storage.get_watermarks(keywords) if incremental else {}
+
+        # 🟢 策略调整：多个浏览器并发抓取，主线程只负责解析和入库
+        with pool:
+            if incremental:
+                # 增量模式：先只抓每个关键词的第 1 页，根据结果决定要不要翻下一页
+                for kw in keywords:
+                    pool.submit(build_task(kw, 1))
+            else:
+                # 全量模式：任务按"页优先"排列，先抓所有关键词的第 1 页，再抓第 2 页...
+                # 这样并发的几个浏览器通常在跑不同的关键词
+                for page in range(1, max_pages + 1):
+                    for kw in keywords:
+                        pool.submit(build_task(kw, page))
+
+            for result in pool.results():
+                kw, page = result.task.keyword, result.task.page
+                prefix = f"[W{result.worker_id}] {kw} 第 {page} 页"
+                phase_totals.update(result.timings)
+                pages_fetched[kw] += 1
+                has_more = page < max_pages
+
+                if not result.html:
+                    failed_pages[kw] += 1
+                    logger.error(f"      ❌ {prefix} 抓取彻底失败")
+                    if on_progress:
+                        on_progress(kw, pages_fetched[kw], new_jobs[kw])
+                    # 这一页不知道有没有新数据，增量模式下继续翻
+                    if incremental and has_more:
+                        pool.submit(build_task(kw, page + 1))
+                    continue
+
+                records = parser.parse(result.html)
+
+                if records:
+                    logger.info(f"      ✅ {prefix} 成功解析 {len(records)} 个职位 ({result.elapsed:.1f}s)")
+
+                    # 数据补全
+                    for record in records:
+                        record.search_keyword = kw
+
+                    # 入库 (一条 INSERT ... ON CONFLICT DO NOTHING 搞定一页)，同一个事务里更新聚合统计
+                    inserted, skipped = storage.save_jobs(records)
+                    new_jobs[kw] += inserted
+
+                    # 第 1 页第 1 条就是这个关键词最新的职位，记为新的水位线
+                    if page == 1 and records[0].url:
+                        storage.set_watermark(kw, records[0].url)
+                    storage.commit()
+                    logger.info(f"      💾 {prefix} 新增入库: {inserted} 条 (已存在 {skipped} 条)")
+                    if on_progress:
+                        on_progress(kw, pages_fetched[kw], new_jobs[kw])
+
+                    if incremental and has_more:
+                        hit_watermark = any(r.url == watermarks.get(kw) for r in records)
+                        if inserted == 0 or hit_watermark:
+                            logger.info(f"      ⏹️ {prefix} 已追上已有数据，停止翻页")
                         else:
-                            logger.warning(f"      ⚠️ 页面已加载但未解析到数据 (可能翻到底了)")
-                            # 如果连续空页，可以 break (这里先不 break 只要一页空)
-                    else:
-                        logger.error(f"      ❌ 第 {page} 页抓取彻底失败")
-
-                    # 翻页休息
-                    import random
-                    sleep_time = random.randint(10, 15)
-                    logger.info(f"      😴 休息 {sleep_time} 秒...")
-                    time.sleep(sleep_time)
-
-            except Exception as kw_err:
-                logger.error(f"❌ 关键词 {kw} 任务发生致命错误: {kw_err}")
-
-            finally:
-                # 无论这个关键词成功还是失败，都关闭浏览器，清理环境
-                browser.close()
-                logger.info(f"🛑 已关闭浏览器。冷却 10 秒准备下一个关键词...")
-                time.sleep(10)
+                            pool.submit(build_task(kw, page + 1))
+
+                else:
+                    # 空页一般是翻到底了，增量模式下不再往后翻
+                    logger.warning(f"      ⚠️ {prefix} 页面已加载但未解析到数据 (可能翻到底了)")
+                    if on_progress:
+                        on_progress(kw, pages_fetched[kw], new_jobs[kw])
+
+        # 增量模式下记录每个关键词这次的产出，定时调度据此调整抓取间隔
+        # 一页都没抓到的 (被封 / 网络故障) 不算数：否则"新增 0 条"会把产出估计压向 0，间隔被拉到最长
+        if incremental:
+            for kw in keywords:
+                ok_pages = pages_fetched[kw] - failed_pages[kw]
+                if ok_pages:
+                    storage.record_crawl_result(kw, ok_pages, new_jobs[kw])
+                elif pages_fetched[kw]:
+                    logger.warning(f"   ⚠️ {kw}: {failed_pages[kw]} 页全部抓取失败，不更新抓取间隔")
+            storage.commit()
 
     except Exception as e:
+        error = str(e)
         logger.critical(f"❌ 主进程崩溃: {e}")
     finally:
         db.close()
-        logger.info("🎉 所有任务结束。")
+        total_pages = sum(pages_fetched.values())
+        total_new = sum(new_jobs.values())
+        logger.info(f"🎉 所有任务结束。共 {total_pages} 页，耗时 {time.monotonic() - started:.0f}s")
+        for kw in keywords:
+            if pages_fetched[kw]:
+                failed = f" (失败 {failed_pages[kw]} 页)" if failed_pages[kw] else ""
+                logger.info(f"   📈 {kw}: {pages_fetched[kw]} 页{failed}, 新增 {new_jobs[kw]} 条, "
+                            f"{new_jobs[kw] / pages_fetched[kw]:.1f} 条/页")
+        if total_pages:
+            logger.info(f"📈 总计: 新增 {total_new} 条, 平均 {total_new / total_pages:.1f} 条/页")
+        if phase_totals:
+            logger.info("⏱️ 浏览器各阶段累计耗时: " + ", ".join(f"{k}={v:.1f}s" for k, v in phase_totals.most_common()))
+
+    return {"pages": dict(pages_fetched), "failed_pages": dict(failed_pages), "new_jobs": dict(new_jobs), "error": error}
 
 
 if __name__ == "__main__":
-    run()
+    ap = argparse.ArgumentParser(description="抓取 Upwork 职位")
+    ap.add_argument("--full", action="store_true", help="全量模式：不看水位线，每个关键词抓满所有页")
+    ap.add_argument("--pages", type=int, default=MAX_PAGES, help="每个关键词最多抓几页")
+    ap.add_argument("keywords", nargs="*", help="要抓的关键词 (默认用内置列表)")
+    args = ap.parse_args()
+    run(keywords=args.keywords or None, max_pages=args.pages, incremental=not args.full)
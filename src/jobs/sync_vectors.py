@@ -1,50 +1,86 @@
-from src.database import SessionLocal
+import argparse
+from src.database import get_sessionmaker
 from src.models import UpworkJob
-from src.core.vector_store import VectorStore
+from src.core.vector_store import VectorStore, content_hash
 from src.core.logger import setup_logger
+from src.config import Config
 
 logger = setup_logger("Job.SyncVectors")
 
 
-def run():
-    db = SessionLocal()
+def run(chunk_size=1000, reindex=False):
+    """
+    增量同步：只同步新增或内容变化 (title + description + 元数据的指纹不同) 的职位
+    没有变化时不会调用任何 embeddings 接口；只有预算 / 类型变了的，向量直接命中缓存
+    :param reindex: 强制重建 ANN 索引
+    """
+    db = get_sessionmaker("worker")()
     vector_db = VectorStore()
 
     try:
-        # 1. 查出所有有描述的职位
-        jobs = db.query(UpworkJob).filter(UpworkJob.description != None).all()
-        logger.info(f"🔍 数据库中共有 {len(jobs)} 个有效职位，准备向量化...")
+        # 1. 已经入库的向量指纹
+        existing = vector_db.get_content_hashes()
+        logger.info(f"📦 向量库中已有 {len(existing)} 个职位")
 
-        batch_size = 50
+        # 2. 分块流式读取所有有描述的职位 (服务端游标，不会一次性全部载入内存)
+        query = db.query(
+            UpworkJob.url, UpworkJob.title, UpworkJob.description,
+            UpworkJob.budget_max, UpworkJob.job_type
+        ).filter(UpworkJob.description != None).yield_per(chunk_size)
+
+        # 每批交给 add_jobs 的数量：足够拆成多个 embeddings 请求并发执行
+        batch_size = Config.EMBED_BATCH_SIZE * Config.EMBED_CONCURRENCY * 2
         batch_data = []
+        failed = []
+        scanned = unchanged = 0
 
-        for job in jobs:
+        for job in query:
+            scanned += 1
             # 准备数据
             # text: 只有描述参与搜索
             # meta: 标题、预算等信息作为元数据存起来，不用搜，但展示时需要
-            item = {
-                "id": job.url,
-                "text": f"{job.title}. {job.description}",  # 把标题和描述拼在一起搜
-                "meta": {
-                    "title": job.title,
-                    "budget": str(job.budget_max) if job.budget_max else "0",
-                    "type": job.job_type or "Unknown"
-                }
+            text = f"{job.title}. {job.description}"  # 把标题和描述拼在一起搜
+            meta = {
+                "title": job.title,
+                "budget": str(job.budget_max) if job.budget_max else "0",
+                "budget_value": job.budget_max or 0,
+                "type": job.job_type or "Unknown"
             }
-            batch_data.append(item)
+            digest = content_hash(text, meta)
+            if existing.get(job.url) == digest:
+                unchanged += 1
+                continue
+
+            batch_data.append({"id": job.url, "text": text, "hash": digest, "meta": meta})
 
             # 批量写入
             if len(batch_data) >= batch_size:
-                vector_db.add_jobs(batch_data)
+                failed += vector_db.add_jobs(batch_data)
                 batch_data = []
 
         # 写入剩余的
         if batch_data:
-            vector_db.add_jobs(batch_data)
+            failed += vector_db.add_jobs(batch_data)
+
+        changed = scanned - unchanged
+        logger.info(f"🔍 扫描 {scanned} 个职位: 未变化 {unchanged}, 新增/变化 {changed}")
+        if vector_db.embedder.cache:
+            logger.info(f"🗃️ 向量缓存: {vector_db.embedder.cache.stats()}")
+        if failed:
+            logger.warning(f"⚠️ 同步完成，{len(failed)} 个职位向量生成失败 (下次同步重试)")
+        else:
+            logger.info("✅ 同步完成")
+
+        # 3. 行数够多时建 / 更新 ANN 索引
+        vector_db.ensure_index(force=reindex)
 
     finally:
         db.close()
 
 
 if __name__ == "__main__":
-    run()
+    ap = argparse.ArgumentParser(description="增量同步职位向量到 LanceDB")
+    ap.add_argument("--chunk-size", type=int, default=1000, help="每批读取 / 生成向量的职位数")
+    ap.add_argument("--reindex", action="store_true", help="强制重建 ANN 索引")
+    args = ap.parse_args()
+    run(chunk_size=args.chunk_size, reindex=args.reindex)
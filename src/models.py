@@ -1,6 +1,14 @@
-from sqlalchemy import Column, String, Integer, Text, DateTime, func
+from sqlalchemy import BigInteger, Boolean, Column, Computed, Float, String, Integer, Text, DateTime, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred
 from src.database import Base
 
+# 全文检索的分词配置 (Upwork 职位基本都是英文)
+FTS_CONFIG = "english"
+
+# term_stats 里所有关键词合计的那一行 (全局 Top N 直接走索引，不用每次 GROUP BY 全表)
+ALL_KEYWORDS = "*"
+
 
 class UpworkJob(Base):
     __tablename__ = "upwork_jobs"
@@ -24,3 +32,171 @@ class UpworkJob(Base):
 
     # 抓取时间
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # 描述的词频是否已计入 term_stats (入库时置 True；老数据为 NULL，由 backfill_term_stats 补算)
+    terms_counted = Column(Boolean, nullable=True)
+
+    # 全文检索向量 (Postgres 生成列，随 title / skills / description 自动更新)
+    # 权重: 标题 A > 技能 B > 描述 C；deferred = 普通查询不加载它
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{FTS_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{FTS_CONFIG}', coalesce(skills, '')), 'B') || "
+            f"setweight(to_tsvector('{FTS_CONFIG}', coalesce(description, '')), 'C')",
+            persisted=True
+        )
+    ))
+
+    # 索引 (已有的库由 init_db.py 补建)
+    __table_args__ = (
+        # /jobs 的游标分页: ORDER BY created_at DESC, url DESC + WHERE (created_at, url) < (...)
+        Index("ix_upwork_jobs_created_at_url", "created_at", "url"),
+        # 按类型过滤时仍然走有序扫描
+        Index("ix_upwork_jobs_job_type_created_at", "job_type", "created_at", "url"),
+        Index("ix_upwork_jobs_budget_min", "budget_min"),
+        Index("ix_upwork_jobs_budget_max", "budget_max"),
+        # ILIKE '%kw%' 子串匹配 (需要 pg_trgm 扩展)
+        Index(
+            "ix_upwork_jobs_search_keyword_trgm", "search_keyword",
+            postgresql_using="gin", postgresql_ops={"search_keyword": "gin_trgm_ops"}
+        ),
+        # /jobs/search 全文检索
+        Index("ix_upwork_jobs_search_vector", "search_vector", postgresql_using="gin"),
+        # 词频回填只扫还没统计过的行 (部分索引，回填完之后几乎是空的)
+        Index("ix_upwork_jobs_terms_pending", "url", postgresql_where=text("terms_counted IS NOT TRUE")),
+    )
+
+
+class CrawlWatermark(Base):
+    """每个关键词的增量抓取水位线"""
+    __tablename__ = "crawl_watermarks"
+
+    search_keyword = Column(String(100), primary_key=True)
+
+    # 上次抓到的最新职位 (搜索结果按 recency 排序，第 1 页第 1 条)
+    # 下次翻页时看到它，说明后面都是老数据了
+    newest_url = Column(String(500))
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class JobAnalysis(Base):
+    """
+    每个职位的 AI 分析状态 (单独一张表，不用改 upwork_jobs 的表结构)
+    没有记录 / 模型或 Prompt 版本变了 / 失败次数没到上限 => 需要 (重新) 分析
+    """
+    __tablename__ = "job_analyses"
+
+    url = Column(String(500), ForeignKey("upwork_jobs.url", ondelete="CASCADE"), primary_key=True)
+
+    analyzed_at = Column(DateTime(timezone=True), server_default=func.now())
+    model = Column(String(100))
+    prompt_version = Column(Integer)
+
+    status = Column(String(20))  # ok / error (None = 领取了还没写回结果)
+    attempts = Column(Integer, default=0)  # 当前模型 + Prompt 版本下已经尝试的次数
+    error = Column(Text, nullable=True)
+
+    # 租约：哪个分析进程什么时候领走的，写回结果时清空；超过 ANALYZE_LEASE_SECONDS 没写回可以被重新领取
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    claimed_by = Column(String(100), nullable=True)
+
+
+class JobStat(Base):
+    """
+    市场聚合统计 (每个 抓取关键词 x 职位类型 一行)，入库时在同一个事务里增量更新
+    /stats 和 /stats/keywords 只读这张小表，不随 upwork_jobs 变大而变慢；
+    出现偏差 (手动删数据等) 时用 python -m src.jobs.rebuild_stats 全量重算
+    """
+    __tablename__ = "job_stats"
+
+    search_keyword = Column(String(100), primary_key=True)
+    job_type = Column(String(50), primary_key=True)
+
+    job_count = Column(BigInteger, nullable=False, default=0)
+
+    # 预算统计只算有预算的职位 (budget_max，没有则用 budget_min)
+    budget_count = Column(BigInteger, nullable=False, default=0)
+    budget_sum = Column(BigInteger, nullable=False, default=0)
+    budget_min = Column(Integer, nullable=True)
+    budget_max = Column(Integer, nullable=True)
+    # 对数分桶的计数，用来估算分位数 (见 src/core/budget_histogram.py)
+    budget_histogram = Column(ARRAY(BigInteger), nullable=False)
+
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TermStat(Base):
+    """
+    职位描述的词频 (每个 抓取关键词 x 词 一行)，入库时在同一个事务里增量累加
+    另外维护 search_keyword = ALL_KEYWORDS 的全局合计行，Dashboard 的热门词汇直接按索引取它的 Top N
+    分词规则见 src/core/text_stats.py
+    """
+    __tablename__ = "term_stats"
+
+    search_keyword = Column(String(100), primary_key=True)
+    term = Column(String(100), primary_key=True)
+
+    occurrences = Column(BigInteger, nullable=False, default=0)  # 出现总次数
+    job_count = Column(BigInteger, nullable=False, default=0)  # 出现过这个词的职位数
+
+    __table_args__ = (
+        # 按关键词 (或全局合计行) 取 Top N
+        Index("ix_term_stats_keyword_occurrences", "search_keyword", "occurrences"),
+    )
+
+
+class CrawlJob(Base):
+    """
+    抓取任务队列 (POST /crawl 入队，python -m src.jobs.crawl_worker 消费)
+    状态: pending -> running -> done / failed；同一个关键词最多只有一个 pending 任务 (重复提交会合并)
+    """
+    __tablename__ = "crawl_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    search_keyword = Column(String(100), nullable=False)
+    max_pages = Column(Integer, nullable=False)
+
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)  # 被 worker 领取过几次 (worker 失联后会重新入队)
+    worker = Column(String(100), nullable=True)  # 正在 / 最后处理它的 worker
+
+    # 进度 (worker 每抓完一页更新一次，同时作为心跳)
+    pages_fetched = Column(Integer, nullable=False, default=0)
+    new_jobs = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # 合并重复提交: INSERT ... ON CONFLICT 依赖这个部分唯一索引
+        Index("uq_crawl_jobs_pending_keyword", "search_keyword", unique=True,
+              postgresql_where=text("status = 'pending'")),
+        # worker 领取任务 / 检查失联任务
+        Index("ix_crawl_jobs_status_id", "status", "id"),
+    )
+
+
+class CrawlKeyword(Base):
+    """
+    定时抓取的关键词 (crawl_scheduler 维护)
+    每次抓完记录新增职位数，估算这个关键词每小时冒出多少新职位 (EWMA)，据此调整抓取间隔：
+    新职位多的抓得勤，几乎不变的拉长间隔
+    """
+    __tablename__ = "crawl_keywords"
+
+    search_keyword = Column(String(100), primary_key=True)
+    enabled = Column(Boolean, nullable=False, default=True)
+
+    interval_seconds = Column(Integer, nullable=False)  # 当前抓取间隔 (未计入全局预算的缩放)
+    rate_ewma = Column(Float, nullable=True)  # 平均每小时新增职位数
+    pages_ewma = Column(Float, nullable=True)  # 平均每次抓取加载几页
+    crawls = Column(Integer, nullable=False, default=0)
+
+    last_run_at = Column(DateTime(timezone=True), nullable=True)  # 上次抓取完成时间
+    next_run_at = Column(DateTime(timezone=True), nullable=True)  # 下次入队时间 (NULL = 尽快)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
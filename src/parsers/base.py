@@ -1,8 +1,43 @@
 # src/parsers/base.py (定义标准)
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, fields
+
+
+@dataclass(slots=True)
+class JobRecord:
+    """
+    解析器的标准输出：一张职位卡片
+    用 __slots__ 的轻量对象代替 DataFrame，每页几十条数据没必要上 pandas
+    """
+    url: str
+    title: str
+    job_type: str
+    budget_min: int
+    budget_max: int
+    posted_time: str
+    description: str
+    skills: str = ""  # 逗号分隔
+    search_keyword: str = ""
+
+    def to_dict(self):
+        return {f: getattr(self, f) for f in JOB_RECORD_FIELDS}
+
+
+JOB_RECORD_FIELDS = tuple(f.name for f in fields(JobRecord))
+
+
+def records_to_df(records):
+    """DataFrame 适配器 (给 Dashboard / 导出等分析场景用)"""
+    import pandas as pd
+    return pd.DataFrame([r.to_dict() for r in records], columns=list(JOB_RECORD_FIELDS))
+
 
 class BaseParser(ABC):
     @abstractmethod
     def parse(self, raw_data):
-        """所有 Parser 必须实现这个方法，输入原始数据，输出 DataFrame"""
+        """所有 Parser 必须实现这个方法，输入原始数据，输出 list[JobRecord]"""
         pass
+
+    def parse_df(self, raw_data):
+        """同 parse，但返回 DataFrame"""
+        return records_to_df(self.parse(raw_data))
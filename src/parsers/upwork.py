@@ -1,17 +1,148 @@
 import re
 import logging
-import pandas as pd
 from bs4 import BeautifulSoup
-from src.parsers.base import BaseParser
+from src.parsers.base import BaseParser, JobRecord
+
+try:
+    from lxml import etree
+except ImportError:  # lxml 是可选依赖，没装就退回 BeautifulSoup
+    etree = None
 
 logger = logging.getLogger("UpworkParser")
 
+# 单遍扫描：一次 finditer 同时找出 预算区间 / 固定预算 / 单一时薪 / 发布时间
+# 每个分支只吃掉开头一个字符，其余部分放在零宽断言 (?=...) 里，互相不会"吃掉"对方的文本，
+# 所以每种模式的第一次出现和单独 re.search 的结果完全一致；
+# 分支都以字面字符开头，正则引擎可以快速跳过无关文本
+# - hi: Hourly 区间 $30.00-$50.00；hr: Hourly 单一价 $30.00/hr (两者的起价都在 lo)
+# - fixed_*: Fixed 预算 "Budget: $500" / "Est. Budget: $500" (不区分大小写)
+# - posted: "Posted 5 minutes ago"
+CARD_FIELDS_RE = re.compile(
+    r'\$(?=(?P<lo>\d{1,3}(?:,\d{3})*)\.?\d*(?:-\$(?P<hi>\d{1,3}(?:,\d{3})*)|(?P<hr>/hr)))'
+    r'|B(?=(?i:udget): \$(?P<fixed_b>[\d,]+))'
+    r'|b(?=(?i:udget): \$(?P<fixed_lb>[\d,]+))'
+    r'|E(?=(?i:st\. budget): \$(?P<fixed_e>[\d,]+))'
+    r'|e(?=(?i:st\. budget): \$(?P<fixed_le>[\d,]+))'
+    r'|P(?=osted (?P<posted>.*?) ago)'
+)
+
+# bs4 (html.parser) 的 get_text 不会输出这些标签里的文本，lxml 后端要保持一致
+_SKIP_TEXT_TAGS = ("script", "style", "template", "rt", "rp")
+
+
+def extract_card_fields(full_text):
+    """
+    从卡片全文中提取 job_type / budget_min / budget_max / posted_time
+    优先级: Hourly 区间 > Fixed > Hourly 单一价 > Unknown
+    """
+    hourly_range = fixed = hourly_single = posted = None
+
+    for m in CARD_FIELDS_RE.finditer(full_text):
+        kind = m.lastgroup
+        if kind == 'hi':
+            hourly_range = hourly_range or m
+        elif kind == 'hr':
+            hourly_single = hourly_single or m
+        elif kind == 'posted':
+            posted = posted or m
+        elif fixed is None:
+            fixed = m.group(kind)
+
+        # 最高优先级的预算和发布时间都找到了，后面的文本不用看了
+        if hourly_range and posted:
+            break
+
+    item = {}
+    if hourly_range:
+        item['job_type'] = 'Hourly'
+        item['budget_min'] = int(hourly_range.group('lo').replace(',', ''))
+        item['budget_max'] = int(hourly_range.group('hi').replace(',', ''))
+    elif fixed:
+        item['job_type'] = 'Fixed'
+        val = int(fixed.replace(',', ''))
+        item['budget_min'] = val
+        item['budget_max'] = val
+    elif hourly_single:
+        item['job_type'] = 'Hourly'
+        val = int(hourly_single.group('lo').replace(',', ''))
+        item['budget_min'] = val
+        item['budget_max'] = val
+    else:
+        item['job_type'] = 'Unknown'
+        item['budget_min'] = 0
+        item['budget_max'] = 0
+
+    item['posted_time'] = posted.group('posted') + " ago" if posted else "Unknown"
+    return item
+
+
+def _normalize_url(href):
+    if href is None:
+        return ""
+    # Upwork 有时给相对路径
+    if href.startswith("/"):
+        href = "https://www.upwork.com" + href
+    return href.split('?')[0]  # 去掉问号后面的参数
+
 
 class UpworkParser(BaseParser):
+    """
+    Upwork 搜索页解析器
+
+    :param backend: "bs4"  = BeautifulSoup + html.parser (纯 Python，最慢，作为参照实现)
+                    "lxml" = lxml (C 实现)，只遍历职位卡片子树
+                    "auto" = 装了 lxml 就用 lxml，否则用 bs4
+    两个后端的输出完全一致。
+    输出是 list[JobRecord]，parse_df 可以得到 DataFrame。
+    """
+
+    BACKENDS = ("bs4", "lxml")
+
+    def __init__(self, backend="auto"):
+        if backend == "auto":
+            backend = "lxml" if etree is not None else "bs4"
+        if backend not in self.BACKENDS:
+            raise ValueError(f"未知的解析后端: {backend}")
+        if backend == "lxml" and etree is None:
+            raise ImportError("lxml 未安装，无法使用 lxml 解析后端")
+        self.backend = backend
+
     def parse(self, html_content):
+        """返回 list[JobRecord] (需要 DataFrame 的话用 parse_df)"""
         if not html_content:
-            return pd.DataFrame()
+            return []
 
+        cards = self._cards_lxml(html_content) if self.backend == "lxml" else self._cards_bs4(html_content)
+        return self._build_records(cards)
+
+    def _build_records(self, cards):
+        """cards: 可迭代的 (title, href, full_text, description)"""
+        data_list = []
+        for card in cards:
+            try:
+                title, href, full_text, description = card
+                data_list.append(JobRecord(
+                    # 1. 标题 (Title)
+                    title=title,
+                    # 2. 链接 (URL)
+                    url=_normalize_url(href),
+                    # 3. 类型与预算 (Type & Budget) + 4. 发布时间
+                    # 我们获取整个卡片的文本来做正则匹配，这样更稳
+                    **extract_card_fields(full_text),
+                    # 5. 描述
+                    description=description
+                ))
+
+            except Exception as e:
+                logger.warning(f"⚠️ 解析出错: {e}")
+                continue
+
+        return data_list
+
+    # ==========================================
+    # 后端 1: BeautifulSoup (html.parser)
+    # ==========================================
+    def _cards_bs4(self, html_content):
         soup = BeautifulSoup(html_content, "html.parser")
 
         # Upwork 职位列表通常在 article 标签或者特定的 section 里
@@ -23,73 +154,64 @@ class UpworkParser(BaseParser):
 
         logger.info(f"🔍 页面中找到了 {len(cards)} 个职位卡片")
 
-        data_list = []
         for card in cards:
-            try:
-                item = {}
-
-                # 1. 标题 (Title)
-                # 通常在 h3 -> a 里面
-                title_tag = card.find("h3")
-                item['title'] = title_tag.get_text(strip=True) if title_tag else "Unknown"
-
-                # 2. 链接 (URL)
-                link_tag = card.find("a", href=True)
-                if link_tag:
-                    href = link_tag['href']
-                    # Upwork 有时给相对路径
-                    if href.startswith("/"):
-                        href = "https://www.upwork.com" + href
-                    item['url'] = href.split('?')[0]  # 去掉问号后面的参数
-                else:
-                    item['url'] = ""
-
-                # 3. 类型与预算 (Type & Budget)
-                # 这些通常在 strong 标签或者特定的 li 里
-                # 我们获取整个卡片的文本来做正则匹配，这样更稳
-                full_text = card.get_text(" | ", strip=True)
-
-                # 匹配 Hourly: $30.00-$50.00
-                hourly_match = re.search(r'\$(\d{1,3}(?:,\d{3})*)\.?\d*-\$(\d{1,3}(?:,\d{3})*)\.?\d*', full_text)
-                if hourly_match:
-                    item['job_type'] = 'Hourly'
-                    item['budget_min'] = int(hourly_match.group(1).replace(',', ''))
-                    item['budget_max'] = int(hourly_match.group(2).replace(',', ''))
-                else:
-                    # 匹配 Fixed: $500
-                    fixed_match = re.search(r'(?:Budget|Est\. Budget): \$([\d,]+)', full_text, re.I)
-                    if fixed_match:
-                        item['job_type'] = 'Fixed'
-                        val = int(fixed_match.group(1).replace(',', ''))
-                        item['budget_min'] = val
-                        item['budget_max'] = val
-                    else:
-                        # 也许是 Hourly 单一价: $30.00/hr
-                        hourly_single = re.search(r'\$(\d{1,3}(?:,\d{3})*)\.?\d*/hr', full_text)
-                        if hourly_single:
-                            item['job_type'] = 'Hourly'
-                            val = int(hourly_single.group(1).replace(',', ''))
-                            item['budget_min'] = val
-                            item['budget_max'] = val
-                        else:
-                            item['job_type'] = 'Unknown'
-                            item['budget_min'] = 0
-                            item['budget_max'] = 0
-
-                # 4. 发布时间
-                # 匹配 "Posted 5 minutes ago"
-                posted_match = re.search(r'Posted (.*?) ago', full_text)
-                item['posted_time'] = posted_match.group(1) + " ago" if posted_match else "Unknown"
-
-                # 5. 描述
-                # Upwork 现在的描述通常在 data-test="job-description-text"
-                desc_tag = card.find(attrs={"data-test": "job-description-text"})
-                item['description'] = desc_tag.get_text(strip=True) if desc_tag else ""
-
-                data_list.append(item)
+            # 通常在 h3 -> a 里面
+            title_tag = card.find("h3")
+            link_tag = card.find("a", href=True)
+            # Upwork 现在的描述通常在 data-test="job-description-text"
+            desc_tag = card.find(attrs={"data-test": "job-description-text"})
+            yield (
+                title_tag.get_text(strip=True) if title_tag else "Unknown",
+                link_tag['href'] if link_tag else None,
+                card.get_text(" | ", strip=True),
+                desc_tag.get_text(strip=True) if desc_tag else "",
+            )
+
+    # ==========================================
+    # 后端 2: lxml
+    # ==========================================
+    def _cards_lxml(self, html_content):
+        root = etree.fromstring(html_content, etree.HTMLParser())
+        if root is None:
+            return
+
+        cards = list(root.iter("article"))
+        if not cards:
+            cards = root.xpath('//*[@data-test="JobTile"]')
 
-            except Exception as e:
-                logger.warning(f"⚠️ 解析出错: {e}")
-                continue
+        logger.info(f"🔍 页面中找到了 {len(cards)} 个职位卡片")
 
-        return pd.DataFrame(data_list)
+        for card in cards:
+            title_tag = next(card.iterdescendants("h3"), None)
+            link_tag = next((a for a in card.iterdescendants("a") if a.get("href") is not None), None)
+            desc_tag = next(
+                (el for el in card.iterdescendants() if el.get("data-test") == "job-description-text"),
+                None
+            )
+            yield (
+                "".join(_lxml_strings(title_tag)) if title_tag is not None else "Unknown",
+                link_tag.get("href") if link_tag is not None else None,
+                " | ".join(_lxml_strings(card)),
+                "".join(_lxml_strings(desc_tag)) if desc_tag is not None else "",
+            )
+
+
+def _lxml_strings(el):
+    """按文档顺序返回 el 内去掉首尾空白后的非空文本 (等价于 bs4 的 get_text(strip=True) 取舍)"""
+    if next(el.iterdescendants(*_SKIP_TEXT_TAGS), None) is None:
+        # 快路径：没有需要跳过的标签，直接用 C 实现的 itertext (会自动跳过注释)
+        texts = el.itertext()
+    else:
+        texts = _walk_text(el)
+    return [t for t in (s.strip() for s in texts) if t]
+
+
+def _walk_text(el):
+    if el.text is not None:
+        yield el.text
+    for child in el:
+        # 注释 / PI 的 tag 不是字符串，它们自身的文本不算，但 tail 算
+        if isinstance(child.tag, str) and child.tag not in _SKIP_TEXT_TAGS:
+            yield from _walk_text(child)
+        if child.tail is not None:
+            yield child.tail
@@ -1,55 +1,539 @@
 # Upsert(去重逻辑)
+from datetime import timedelta
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import text, TextClause
+from sqlalchemy import BigInteger, Float, and_, case, cast, delete, func, literal, literal_column, or_, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from src.config import Config
+from src.core.crawl_schedule import ewma, ideal_interval
+from src.core.budget_histogram import BUCKETS_PER_DECADE, NUM_BUCKETS, bucket_index, empty_histogram
 from src.core.logger import setup_logger
-import pandas as pd
+from src.core.text_stats import term_counts
+from src.models import ALL_KEYWORDS, CrawlJob, CrawlKeyword, CrawlWatermark, JobAnalysis, JobStat, TermStat, UpworkJob
 
 logger = setup_logger("PostgresStorage")
 
 
+def _stat_key(keyword, job_type):
+    """job_stats 的主键 (缺失的关键词 / 类型记为空串)"""
+    return keyword or "", job_type or ""
+
+
+def _budget_value(budget_min, budget_max):
+    """
+    统计用的预算: budget_max，没有则用 budget_min；0 / None 表示没有预算
+    >= BUDGET_OUTLIER_LIMIT 的假预算同样算作没有预算
+    """
+    budget = budget_max or budget_min or 0
+    return budget if budget < Config.BUDGET_OUTLIER_LIMIT else 0
+
+
+def _budget_sql():
+    """_budget_value 的 SQL 版"""
+    budget = func.coalesce(func.nullif(UpworkJob.budget_max, 0), UpworkJob.budget_min, 0)
+    return case((budget < Config.BUDGET_OUTLIER_LIMIT, budget), else_=0)
+
+
+def _budget_bucket_sql(budget):
+    """budget_histogram.bucket_index 的 SQL 版 (Postgres 的 log() 是以 10 为底)"""
+    raw = func.floor(func.log(cast(func.greatest(budget, 1), Float)) * BUCKETS_PER_DECADE)
+    return cast(func.least(raw, NUM_BUCKETS - 1), BigInteger)
+
+
 class PostgresStorage:
     def __init__(self, db_session: Session):
         self.db = db_session
 
-    def save_df_upsert(self, df: pd.DataFrame, table_name: str, date_col: str = 'trade_date'):
+    def bulk_upsert(self, model_class, rows, update=False, chunk_size=1000, return_rows=False):
+        """
+        按主键批量 Upsert (一条 INSERT ... ON CONFLICT ... RETURNING 搞定一批)
+        :param model_class: ORM 模型，例如 UpworkJob (冲突判断用它的主键)
+        :param rows: list of dict (key 为列名) 或 JobRecord 这类带 to_dict() 的记录；多余的字段会被忽略
+        :param update: False = 已存在则跳过 (DO NOTHING)；True = 已存在则用新值覆盖 (DO UPDATE)
+        :param return_rows: True 时第一个返回值是新插入的行 (清洗后的 dict 列表)，而不是条数
+        :return: (inserted, skipped) —— 新插入条数、已存在条数 (update=True 时即被更新的条数)
+        """
+        table = model_class.__table__
+        pk_cols = [c.name for c in table.primary_key.columns]
+        columns = set(table.columns.keys())
+
+        # 1. 清洗：只保留表里有的列，丢掉没有主键的行，同一批里主键重复的只留最后一条
+        # (同一条 INSERT 里主键重复，ON CONFLICT DO UPDATE 会直接报错)
+        unique = {}
+        for row in rows:
+            if not isinstance(row, dict):
+                row = row.to_dict()
+            values = {k: v for k, v in row.items() if k in columns}
+            key = tuple(values.get(c) for c in pk_cols)
+            if any(k is None or k == "" for k in key):
+                continue
+            unique[key] = values
+        if not unique:
+            return 0, 0
+
+        # 多行 VALUES 要求每行的列一致
+        keys = sorted({k for values in unique.values() for k in values})
+        data = [{k: values.get(k) for k in keys} for values in unique.values()]
+        inserted_keys = []
+
+        # 2. 分块执行 (Postgres 单条语句最多 65535 个绑定参数)
+        for i in range(0, len(data), chunk_size):
+            chunk = data[i:i + chunk_size]
+            stmt = pg_insert(table).values(chunk)
+
+            if update:
+                update_cols = {
+                    c: stmt.excluded[c]
+                    for c in keys
+                    if c not in pk_cols
+                }
+                # xmax = 0 说明这一行是刚插入的，而不是被更新的
+                stmt = stmt.on_conflict_do_update(index_elements=pk_cols, set_=update_cols)
+                stmt = stmt.returning(literal_column("(xmax = 0)"), *[table.c[c] for c in pk_cols])
+                inserted_keys += [tuple(row[1:]) for row in self.db.execute(stmt) if row[0]]
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=pk_cols)
+                stmt = stmt.returning(*[table.c[c] for c in pk_cols])
+                inserted_keys += [tuple(row) for row in self.db.execute(stmt)]
+
+        inserted = len(inserted_keys)
+        skipped = len(data) - inserted
+        logger.info(f"💾 [{table.name}] 批量写入 {len(data)} 条: 新增 {inserted}, 已存在 {skipped}")
+        if return_rows:
+            return [unique[key] for key in inserted_keys], skipped
+        return inserted, skipped
+
+    def save_jobs(self, records):
+        """
+        职位入库 (已存在的跳过)，并在同一个事务里把新职位计入 job_stats / term_stats (不提交)
+        :return: (inserted, skipped)
+        """
+        rows = [dict(r if isinstance(r, dict) else r.to_dict(), terms_counted=True) for r in records]
+        new_rows, skipped = self.bulk_upsert(UpworkJob, rows, return_rows=True)
+        self.update_job_stats(new_rows)
+        self.update_term_stats(new_rows)
+        return len(new_rows), skipped
+
+    def update_job_stats(self, rows):
         """
-        通用的 Upsert (有则忽略，无则插入) 逻辑
-        :param df: 要存的数据
-        :param table_name: 表名 (由调用者决定，而不是写死)
-        :param date_col: 用来判断重复的日期列名 (默认 trade_date)
+        把一批新职位累加进 job_stats (INSERT ... ON CONFLICT DO UPDATE，计数和直方图都在 SQL 里相加)
+        并发入库时两个事务改同一行会排队，不会丢计数；按主键排序写入，避免互相死锁
         """
-        if df.empty:
+        groups = {}
+        for row in rows:
+            key = _stat_key(row.get("search_keyword"), row.get("job_type"))
+            stat = groups.setdefault(key, {
+                "job_count": 0, "budget_count": 0, "budget_sum": 0,
+                "budget_min": None, "budget_max": None, "budget_histogram": empty_histogram(),
+            })
+            stat["job_count"] += 1
+            budget = _budget_value(row.get("budget_min"), row.get("budget_max"))
+            if budget:
+                stat["budget_count"] += 1
+                stat["budget_sum"] += budget
+                stat["budget_min"] = budget if stat["budget_min"] is None else min(stat["budget_min"], budget)
+                stat["budget_max"] = budget if stat["budget_max"] is None else max(stat["budget_max"], budget)
+                stat["budget_histogram"][bucket_index(budget)] += 1
+        if not groups:
             return
 
-        try:
-            # 1. 检查重复逻辑 (通用化)
-            current_date = df[date_col].iloc[0]
-
-            # 使用绑定参数防止注入，且表名也不能直接拼字符串，但 table_name 通常是可信的
-            # 注意：SQLAlchemy 的 text() 不支持表名作为参数绑定，所以这里用 f-string 是妥协，
-            # 但前提是 table_name 是内部代码控制的，不是用户输入的。
-            check_sql: TextClause = text(f"SELECT count(*) FROM {table_name} WHERE {date_col} = :date")
-            result = self.db.execute(check_sql, {"date": current_date}).scalar()
-
-            if result > 0:
-                logger.warning(f"⚠️ [{table_name}] {current_date} 数据已存在 ({result} 条)。跳过。")
-                return
-
-                # 2. 批量插入
-            logger.info(f"💾 正在写入 {len(df)} 条数据到 {table_name}...")
-            df.to_sql(
-                name=table_name,
-                con=self.db.bind,
-                if_exists='append',
-                index=False,
-                method='multi',
-                chunksize=1000
+        table = JobStat.__table__
+        stmt = pg_insert(table).values([
+            {"search_keyword": kw, "job_type": job_type, "last_seen_at": func.now(), **stat}
+            for (kw, job_type), stat in sorted(groups.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["search_keyword", "job_type"],
+            set_={
+                "job_count": table.c.job_count + stmt.excluded.job_count,
+                "budget_count": table.c.budget_count + stmt.excluded.budget_count,
+                "budget_sum": table.c.budget_sum + stmt.excluded.budget_sum,
+                # LEAST / GREATEST 会忽略 NULL
+                "budget_min": func.least(table.c.budget_min, stmt.excluded.budget_min),
+                "budget_max": func.greatest(table.c.budget_max, stmt.excluded.budget_max),
+                # 两个数组按位相加
+                "budget_histogram": text(
+                    "ARRAY(SELECT coalesce(a, 0) + coalesce(b, 0) "
+                    "FROM unnest(job_stats.budget_histogram, excluded.budget_histogram) AS t(a, b))"
+                ),
+                "last_seen_at": func.greatest(table.c.last_seen_at, stmt.excluded.last_seen_at),
+            }
+        )
+        self.db.execute(stmt)
+
+    def update_term_stats(self, rows, chunk_size=5000):
+        """
+        把一批职位描述的词频累加进 term_stats (分词规则见 src/core/text_stats.py)
+        同时累加全局合计行 (search_keyword = ALL_KEYWORDS)
+        """
+        totals = {}
+        for row in rows:
+            keyword = row.get("search_keyword") or ""
+            for term, n in term_counts(row.get("description")).items():
+                for key in ((keyword, term), (ALL_KEYWORDS, term)):
+                    counts = totals.setdefault(key, [0, 0])
+                    counts[0] += n
+                    counts[1] += 1
+        if not totals:
+            return
+
+        table = TermStat.__table__
+        data = [
+            {"search_keyword": kw, "term": term, "occurrences": occ, "job_count": jobs}
+            for (kw, term), (occ, jobs) in sorted(totals.items())
+        ]
+        for i in range(0, len(data), chunk_size):
+            stmt = pg_insert(table).values(data[i:i + chunk_size])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["search_keyword", "term"],
+                set_={
+                    "occurrences": table.c.occurrences + stmt.excluded.occurrences,
+                    "job_count": table.c.job_count + stmt.excluded.job_count,
+                }
             )
-            logger.info(f"✅ [{table_name}] 入库成功！")
+            self.db.execute(stmt)
 
-        except Exception as e:
-            logger.error(f"❌ [{table_name}] 入库失败: {e}")
-            self.db.rollback()
+    def rebuild_term_rollup(self):
+        """
+        从各关键词的行重算全局合计行 (不提交)；上线合计行之前统计的词频用它补齐
+        和 rebuild_job_stats 一样先加 EXCLUSIVE 锁，重算期间的入库等重算提交后再累加
+        :return: 合计行的词数
+        """
+        self.db.execute(text("LOCK TABLE term_stats IN EXCLUSIVE MODE"))
+        self.db.execute(delete(TermStat).where(TermStat.search_keyword == ALL_KEYWORDS))
+        self.db.execute(
+            pg_insert(TermStat).from_select(
+                ["search_keyword", "term", "occurrences", "job_count"],
+                select(literal(ALL_KEYWORDS), TermStat.term,
+                       func.sum(TermStat.occurrences), func.sum(TermStat.job_count))
+                .where(TermStat.search_keyword != ALL_KEYWORDS)
+                .group_by(TermStat.term)
+            )
+        )
+        return self.db.query(TermStat).filter(TermStat.search_keyword == ALL_KEYWORDS).count()
+
+    def claim_jobs_without_terms(self, limit):
+        """
+        锁定一批词频还没统计过的老职位 (FOR UPDATE SKIP LOCKED，可以多进程回填)
+        :return: list of (url, search_keyword, description)
+        """
+        return (
+            self.db.query(UpworkJob.url, UpworkJob.search_keyword, UpworkJob.description)
+            .filter(UpworkJob.terms_counted.isnot(True))
+            .order_by(UpworkJob.url)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def mark_terms_counted(self, urls):
+        if urls:
+            self.db.execute(update(UpworkJob).where(UpworkJob.url.in_(urls)).values(terms_counted=True))
+
+    def rebuild_job_stats(self):
+        """
+        从 upwork_jobs 全量重算 job_stats (不提交)
+        先对 job_stats 加 EXCLUSIVE 锁：正在入库的事务提交之后才开始重算，之后的入库等重算提交后再累加，
+        这样既不会漏算也不会重复计数 (重算期间 /stats 仍然可读)
+        :return: 重算后的分组数
+        """
+        self.db.execute(text("LOCK TABLE job_stats IN EXCLUSIVE MODE"))
+        self.db.execute(delete(JobStat))
+
+        budget = _budget_sql()
+        has_budget = budget > 0
+        keyword = func.coalesce(UpworkJob.search_keyword, "")
+        job_type = func.coalesce(UpworkJob.job_type, "")
+        self.db.execute(
+            pg_insert(JobStat).from_select(
+                ["search_keyword", "job_type", "job_count", "budget_count", "budget_sum",
+                 "budget_min", "budget_max", "budget_histogram", "last_seen_at"],
+                select(
+                    keyword, job_type,
+                    func.count(),
+                    func.count().filter(has_budget),
+                    func.coalesce(func.sum(budget).filter(has_budget), 0),
+                    func.min(budget).filter(has_budget),
+                    func.max(budget).filter(has_budget),
+                    literal(empty_histogram(), ARRAY(BigInteger)),
+                    func.max(UpworkJob.created_at),
+                ).group_by(keyword, job_type)
+            )
+        )
+
+        # 直方图: 再按 (分组, 桶) 聚合一次，在 Python 里拼成数组后按主键批量 UPDATE
+        bucket = _budget_bucket_sql(budget)
+        histograms = {}
+        counts = (
+            select(keyword, job_type, bucket, func.count())
+            .where(has_budget)
+            .group_by(keyword, job_type, bucket)
+        )
+        for kw, jt, b, n in self.db.execute(counts):
+            histograms.setdefault((kw, jt), empty_histogram())[b] = n
+        if histograms:
+            self.db.execute(update(JobStat), [
+                {"search_keyword": kw, "job_type": jt, "budget_histogram": hist}
+                for (kw, jt), hist in histograms.items()
+            ])
+        return self.db.query(JobStat).count()
+
+    def get_watermarks(self, keywords):
+        """批量读取关键词的增量水位线，返回 {keyword: newest_url}"""
+        rows = self.db.query(CrawlWatermark).filter(CrawlWatermark.search_keyword.in_(list(keywords))).all()
+        return {row.search_keyword: row.newest_url for row in rows}
+
+    def set_watermark(self, keyword, newest_url):
+        """更新关键词的水位线 (不存在则插入)"""
+        self.bulk_upsert(
+            CrawlWatermark,
+            [{"search_keyword": keyword, "newest_url": newest_url, "updated_at": func.now()}],
+            update=True
+        )
+
+    def claim_unanalyzed_jobs(self, model, prompt_version, limit, max_attempts=3, worker=None, lease_seconds=900):
+        """
+        领取一批需要 AI 分析的职位 (租约)，立即提交：调用 AI 期间不持有行锁，也没有打开的事务
+        1. 挑候选：没分析过 / 需要重新分析，并且没有未过期的租约
+           (FOR UPDATE SKIP LOCKED 只是让同时领取的进程错开，锁在本方法提交时就释放)
+        2. 在 job_analyses 上写租约；ON CONFLICT ... WHERE 在行锁下重新检查租约，
+           两个进程抢到同一个职位时只有一个能写进去 (RETURNING 里才有)
+        进程中途退出时，租约 lease_seconds 秒后过期，职位会被重新领取
+        :return: list of (url, description)
+        """
+        table = JobAnalysis.__table__
+        lease_expired = func.now() - timedelta(seconds=lease_seconds)
+        candidates = (
+            self.db.query(UpworkJob.url, UpworkJob.description)
+            .outerjoin(JobAnalysis, JobAnalysis.url == UpworkJob.url)
+            .filter(UpworkJob.description.isnot(None), UpworkJob.description != "")
+            .filter(or_(JobAnalysis.claimed_at.is_(None), JobAnalysis.claimed_at < lease_expired))
+            .filter(or_(
+                JobAnalysis.url.is_(None),
+                JobAnalysis.status.is_(None),  # 领取过但没写回结果
+                JobAnalysis.model != model,
+                JobAnalysis.prompt_version != prompt_version,
+                and_(JobAnalysis.status == "error", JobAnalysis.attempts < max_attempts),
+            ))
+            .order_by(UpworkJob.created_at.desc())
+            .limit(limit)
+            .with_for_update(of=UpworkJob, skip_locked=True)
+            .all()
+        )
+        if not candidates:
+            self.commit()
+            return []
+
+        stmt = pg_insert(table).values([
+            {"url": url, "analyzed_at": None, "attempts": 0, "claimed_at": func.now(), "claimed_by": worker}
+            for url, _ in candidates
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["url"],
+            set_={"claimed_at": stmt.excluded.claimed_at, "claimed_by": stmt.excluded.claimed_by},
+            where=or_(table.c.claimed_at.is_(None), table.c.claimed_at < lease_expired),
+        ).returning(table.c.url)
+        claimed = {url for (url,) in self.db.execute(stmt)}
+        self.commit()
+        return [(url, description) for url, description in candidates if url in claimed]
+
+    def save_analyses(self, results, model, prompt_version):
+        """
+        写回一批分析结果，同时释放租约 (不提交，由调用方 commit)
+        :param results: list of (url, skills, error)，error 为 None 表示成功
+        """
+        if not results:
+            return
+        ok = [{"url": url, "skills": skills} for url, skills, error in results if error is None]
+        if ok:
+            # ORM 按主键批量 UPDATE (executemany)
+            self.db.execute(update(UpworkJob), ok)
+
+        table = JobAnalysis.__table__
+        stmt = pg_insert(table).values([
+            {
+                "url": url,
+                "analyzed_at": func.now(),
+                "model": model,
+                "prompt_version": prompt_version,
+                "status": "ok" if error is None else "error",
+                "attempts": 1,
+                "error": error,
+                "claimed_at": None,
+                "claimed_by": None,
+            }
+            for url, skills, error in results
+        ])
+        same_version = and_(table.c.model == stmt.excluded.model,
+                            table.c.prompt_version == stmt.excluded.prompt_version)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["url"],
+            set_={
+                "analyzed_at": stmt.excluded.analyzed_at,
+                "model": stmt.excluded.model,
+                "prompt_version": stmt.excluded.prompt_version,
+                "status": stmt.excluded.status,
+                "error": stmt.excluded.error,
+                "claimed_at": None,
+                "claimed_by": None,
+                # 换了模型 / Prompt 版本后重新计数
+                "attempts": case((same_version, table.c.attempts + 1), else_=1),
+            }
+        )
+        self.db.execute(stmt)
+
+    # ==========================================
+    # 抓取任务队列 (crawl_jobs)
+    # ==========================================
+    def enqueue_crawl(self, keyword, max_pages):
+        """
+        提交抓取任务 (不提交事务)；这个关键词已经有 pending 任务时合并进去 (页数取较大的)
+        :return: (任务 id, 是否新建)
+        """
+        table = CrawlJob.__table__
+        stmt = pg_insert(table).values(search_keyword=keyword, max_pages=max_pages, status="pending")
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["search_keyword"],
+            index_where=text("status = 'pending'"),
+            set_={"max_pages": func.greatest(table.c.max_pages, stmt.excluded.max_pages)},
+        ).returning(table.c.id, literal_column("(xmax = 0)"))
+        job_id, created = self.db.execute(stmt).one()
+        return job_id, created
+
+    def claim_crawl_job(self, worker):
+        """
+        领取最早的一个 pending 任务 (FOR UPDATE SKIP LOCKED：多个 worker 不会领到同一个)，立即提交
+        :return: (id, keyword, max_pages) 或 None
+        """
+        next_id = (
+            select(CrawlJob.id)
+            .where(CrawlJob.status == "pending")
+            .order_by(CrawlJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        row = self.db.execute(
+            update(CrawlJob)
+            .where(CrawlJob.id == next_id)
+            .values(status="running", worker=worker, attempts=CrawlJob.attempts + 1,
+                    started_at=func.now(), heartbeat_at=func.now(), error=None)
+            .returning(CrawlJob.id, CrawlJob.search_keyword, CrawlJob.max_pages)
+        ).first()
+        self.commit()
+        return tuple(row) if row else None
+
+    def update_crawl_progress(self, job_id, pages_fetched, new_jobs):
+        """更新进度，同时刷新心跳 (立即提交，GET /crawl/{id} 马上能看到)"""
+        self.db.execute(
+            update(CrawlJob).where(CrawlJob.id == job_id)
+            .values(pages_fetched=pages_fetched, new_jobs=new_jobs, heartbeat_at=func.now())
+        )
+        self.commit()
+
+    def finish_crawl_job(self, job_id, error=None):
+        self.db.execute(
+            update(CrawlJob).where(CrawlJob.id == job_id)
+            .values(status="failed" if error else "done", error=error, finished_at=func.now())
+        )
+        self.commit()
+
+    def requeue_stale_crawl_jobs(self, stale_seconds, max_attempts):
+        """
+        worker 崩溃 / 被杀掉后，它领取的任务一直停在 running：心跳超时的重新入队，
+        重试次数用完 (或者同一个关键词已经有新的 pending 任务) 的标记为失败
+        :return: (重新入队数, 标记失败数)
+        """
+        stale = (
+            self.db.query(CrawlJob)
+            .filter(CrawlJob.status == "running",
+                    CrawlJob.heartbeat_at < func.now() - timedelta(seconds=stale_seconds))
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        requeued = failed = 0
+        for job in stale:
+            if job.attempts < max_attempts:
+                try:
+                    # 撞上同一个关键词的 pending 任务 (部分唯一索引) 时只回滚这一条
+                    with self.db.begin_nested():
+                        job.status, job.worker = "pending", None
+                    requeued += 1
+                    continue
+                except IntegrityError:
+                    self.db.refresh(job)
+            job.status, job.finished_at = "failed", func.now()
+            job.error = f"worker 失联 (已尝试 {job.attempts} 次)"
+            failed += 1
+        self.commit()
+        return requeued, failed
+
+    # ==========================================
+    # 定时抓取的关键词 (crawl_keywords)
+    # ==========================================
+    def add_crawl_keywords(self, keywords, interval_seconds=None):
+        """添加 (或重新启用) 定时抓取的关键词，不提交；已有的关键词保留它学到的间隔"""
+        rows = [
+            {"search_keyword": kw, "enabled": True,
+             "interval_seconds": interval_seconds or Config.CRAWL_DEFAULT_INTERVAL}
+            for kw in dict.fromkeys(keywords) if kw
+        ]
+        if not rows:
+            return
+        stmt = pg_insert(CrawlKeyword.__table__).values(rows)
+        set_ = {"enabled": True}
+        if interval_seconds:
+            set_["interval_seconds"] = stmt.excluded.interval_seconds
+        self.db.execute(stmt.on_conflict_do_update(index_elements=["search_keyword"], set_=set_))
+
+    def disable_crawl_keyword(self, keyword):
+        return self.db.execute(
+            update(CrawlKeyword).where(CrawlKeyword.search_keyword == keyword).values(enabled=False)
+        ).rowcount
+
+    def list_crawl_keywords(self, enabled_only=True):
+        query = self.db.query(CrawlKeyword)
+        if enabled_only:
+            query = query.filter(CrawlKeyword.enabled.is_(True))
+        return query.order_by(CrawlKeyword.search_keyword).all()
+
+    def due_crawl_keywords(self):
+        """到期 (next_run_at 已过) 且队列里没有它的 pending / running 任务的关键词，锁定后返回"""
+        in_queue = (
+            select(CrawlJob.id)
+            .where(CrawlJob.search_keyword == CrawlKeyword.search_keyword,
+                   CrawlJob.status.in_(["pending", "running"]))
+            .exists()
+        )
+        return (
+            self.db.query(CrawlKeyword)
+            .filter(CrawlKeyword.enabled.is_(True),
+                    or_(CrawlKeyword.next_run_at.is_(None), CrawlKeyword.next_run_at <= func.now()),
+                    ~in_queue)
+            .order_by(CrawlKeyword.next_run_at.asc().nullsfirst())
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def record_crawl_result(self, keyword, pages, new_jobs):
+        """
+        一次抓取完成后更新这个关键词的产出统计和抓取间隔 (不提交)
+        每小时新增数 = 本次新增 / 距上次抓取的小时数，EWMA 平滑；不在 crawl_keywords 里的关键词忽略
+        :param pages: 成功加载的页数 (全部失败的抓取不要调用，保持原来的间隔和 last_run_at)
+        """
+        kw = self.db.query(CrawlKeyword).filter(CrawlKeyword.search_keyword == keyword) \
+            .with_for_update().one_or_none()
+        if kw is None:
+            return None
+        now = self.db.execute(select(func.now())).scalar()
+        if kw.last_run_at is not None:
+            hours = max((now - kw.last_run_at).total_seconds() / 3600, 1 / 60)
+            kw.rate_ewma = ewma(kw.rate_ewma, new_jobs / hours)
+        kw.pages_ewma = ewma(kw.pages_ewma, pages)
+        kw.interval_seconds = ideal_interval(kw.rate_ewma)
+        kw.crawls += 1
+        kw.last_run_at = now
+        return kw
 
     # ==========================================
     # 2. 基础 CRUD 工具 (Basic Operations)